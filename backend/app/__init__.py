@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Runs before any app module reads its os.getenv() settings, whatever the entrypoint
+load_dotenv()
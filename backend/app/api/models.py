@@ -1,15 +1,19 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
 class SignUpModel(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     name: str
     email: str
     password: str
     phone: Optional[str] = None
-    created_at: datetime
+    created_at: Optional[datetime] = None
 
 class LoginModel(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     email: str
     password: str
 
@@ -21,10 +25,15 @@ class User(BaseModel):
     created_at: datetime
 
 class UpdateUserSettingsModel(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     phone: Optional[str] = None 
     password: Optional[str] = None 
 
 class profileModel(BaseModel):
+    # Flat model of plain fields: validated once on the way in, never mutated afterwards
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     profile_name: str
     user_id: int
     name: str
@@ -39,13 +48,16 @@ class profileModel(BaseModel):
     projects: Optional[str] = None
     languages: Optional[str] = None
     hobbies: Optional[str] = None
-    created_at: datetime
+    created_at: Optional[datetime] = None
 
 class NewResume(BaseModel):
+    # The route fills in new_resume after generation; assignments skip re-validation
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+
     user_id: int
     user_resume_id: int
     name: str
     job_title: str
     job_description: str
     new_resume: Optional[str] = None
-    created_at: datetime
\ No newline at end of file
+    created_at: Optional[datetime] = None
\ No newline at end of file
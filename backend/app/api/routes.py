@@ -1,21 +1,56 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from app.core.database import UserRepository, ProfileRepository, ResumeRepository
-from app.core.service import create_resume, convert_latex_to_pdf
+from app.core.database import UserRepository, ProfileRepository, ResumeRepository, init_db, close_db_connections
+from app.core.service import create_resume, create_resume_stream, convert_latex_to_pdf, warm_latex_format
 from app.api.models import LoginModel, NewResume, SignUpModel, UpdateUserSettingsModel, profileModel
 from app.core.logs import logger
 from app.core.service import convert_pdf_to_json
 
-api_routes = FastAPI()
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves PDF downloads and streamed LaTeX untouched.
+
+    PDFs are already compressed, and gzip would hold back the chunks of a stream.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith(("/pdf", "/stream")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the schema once per process at startup rather than as an import side effect
+    init_db()
+    warm_latex_format()
+    yield
+    close_db_connections()
+
+# Any route that returns plain data instead of success_response() is still encoded by orjson
+api_routes = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+api_routes.add_middleware(JSONGZipMiddleware, minimum_size=1024, compresslevel=6)
+# Comma-separated frontend origins, e.g. "https://ats-friend.example.com,http://localhost:5173";
+# defaults to the Vite dev server
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",") if origin.strip()]
 
 api_routes.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    # With "*" Starlette would echo any caller's origin back; never pair that with credentials
+    allow_credentials="*" not in CORS_ORIGINS,
+    allow_methods=["GET", "POST", "PATCH"],
+    allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["Content-Disposition", "X-Resume-ID"],
+    # Let browsers reuse a preflight for a day instead of sending OPTIONS before each call
+    max_age=86400,
 )
 
 class ApiResponse(BaseModel):
@@ -23,67 +58,143 @@ class ApiResponse(BaseModel):
     message: str | None = None
     data: dict | list | None = None
 
+def success_response(data: dict, message: str | None = None) -> ORJSONResponse:
+    """Builds the ApiResponse envelope with orjson.
+
+    Handlers return this directly, so FastAPI skips response_model validation and
+    jsonable_encoder; response_model=ApiResponse is kept only for the OpenAPI schema.
+    """
+    return ORJSONResponse({"status": "success", "message": message, "data": data})
+
+# Repositories hold no per-request state, so one instance of each is shared
+USER_REPO = UserRepository()
+PROFILE_REPO = ProfileRepository()
+RESUME_REPO = ResumeRepository()
+
 def get_user_repo():
-    return UserRepository()
+    return USER_REPO
 
 def get_profile_repo():
-    return ProfileRepository()
+    return PROFILE_REPO
 
 def get_resume_repo():
-    return ResumeRepository()
+    return RESUME_REPO
 
 class ResumeService:
-    def __init__(self, profile_repo: ProfileRepository, resume_repo: ResumeRepository):
+    def __init__(self, profile_repo: ProfileRepository, resume_repo: ResumeRepository, user_repo: UserRepository):
         self.profile_repo = profile_repo
         self.resume_repo = resume_repo
+        self.user_repo = user_repo
 
-    async def create_resume(self, new_resume: NewResume):
-        profile_details = self.profile_repo.get_by_id(new_resume.user_resume_id)
+    async def get_profile_details(self, new_resume: NewResume) -> dict:
+        # The user and profile lookups are independent, so run them concurrently
+        user, profile_details = await asyncio.gather(
+            self.user_repo.aget_by_id(new_resume.user_id),
+            self.profile_repo.aget_by_id(new_resume.user_resume_id),
+        )
+        if not user:
+            logger.error(f"User {new_resume.user_id} not found")
+            raise HTTPException(status_code=404, detail="User not found")
         if not profile_details:
             raise HTTPException(status_code=404, detail="Profile not found")
+        return profile_details
+
+    async def create_resume(self, new_resume: NewResume):
+        profile_details = await self.get_profile_details(new_resume)
         gen_resume = await create_resume(profile_details, new_resume.job_title, new_resume.job_description)
         if not gen_resume:
             raise HTTPException(status_code=500, detail="Resume generation failed")
 
         new_resume.new_resume = str(gen_resume)
-        result = self.resume_repo.create(new_resume.dict())
+        result = await self.resume_repo.acreate(new_resume.model_dump())
         if result["status"] != "success":
             raise HTTPException(status_code=400, detail="Resume creation failed")
 
         return result
 
-def get_resume_service(profile_repo: ProfileRepository = Depends(get_profile_repo), resume_repo: ResumeRepository = Depends(get_resume_repo)):
-    return ResumeService(profile_repo, resume_repo)
+    async def stream_resume(self, new_resume: NewResume) -> StreamingResponse:
+        """Streams the generated LaTeX to the client and stores it once generation completes."""
+        profile_details = await self.get_profile_details(new_resume)
+        chunks: list[str] = []
+        completed = False
+
+        async def generate():
+            nonlocal completed
+            async for chunk in create_resume_stream(profile_details, new_resume.job_title, new_resume.job_description):
+                chunks.append(chunk)
+                yield chunk
+            completed = True
+
+        def save():
+            # Runs after the response body is sent; skip partial output from aborted streams
+            if not completed or not chunks:
+                logger.error(f"Resume stream for user {new_resume.user_id} did not complete, not saving")
+                return
+            new_resume.new_resume = "".join(chunks)
+            result = self.resume_repo.create(new_resume.model_dump())
+            if result["status"] == "success":
+                logger.info(f"Streamed resume {result['resume_id']} saved for user {new_resume.user_id}")
+            else:
+                logger.error(f"Failed to save streamed resume for user {new_resume.user_id}: {result['message']}")
+
+        return StreamingResponse(generate(), media_type="text/plain", background=BackgroundTask(save))
+
+def get_resume_service(profile_repo: ProfileRepository = Depends(get_profile_repo), resume_repo: ResumeRepository = Depends(get_resume_repo), user_repo: UserRepository = Depends(get_user_repo)):
+    return ResumeService(profile_repo, resume_repo, user_repo)
 
 @api_routes.post("/login", response_model=ApiResponse)
 async def login(login_modal: LoginModel, user_repo: UserRepository = Depends(get_user_repo)):
     logger.info(f"Login attempt for email: {login_modal.email}")
-    result = user_repo.check_login(login_modal.email, login_modal.password)
+    result = await user_repo.acheck_login(login_modal.email, login_modal.password)
     if result["status"] == "success":
         logger.info(f"User {login_modal.email} logged in successfully")
-        return ApiResponse(status="success", data={"user": result["user"]})
+        return success_response({"user": result["user"]})
     logger.warning(f"Failed login for email: {login_modal.email}")
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @api_routes.post("/signup", response_model=ApiResponse)
 async def signup(signup_modal: SignUpModel, user_repo: UserRepository = Depends(get_user_repo)):
     logger.info(f"Signup attempt for email: {signup_modal.email}")
-    result = user_repo.signup(signup_modal.name, signup_modal.email, signup_modal.password, signup_modal.phone)
+    result = await user_repo.asignup(signup_modal.name, signup_modal.email, signup_modal.password, signup_modal.phone)
     if result["status"] == "success":
         logger.info(f"User {signup_modal.email} signed up successfully")
-        return ApiResponse(status="success", data={"user": result["user"]})
+        return success_response({"user": result["user"]})
     logger.error(f"Signup failed for email: {signup_modal.email}: {result['message']}")
     raise HTTPException(status_code=400, detail="User already exists")
 
 @api_routes.get("/user/{user_id}", response_model=ApiResponse)
 async def get_user(user_id: int, user_repo: UserRepository = Depends(get_user_repo)):
-    user = user_repo.get_by_id(user_id)
+    user = await user_repo.aget_by_id(user_id)
     if user:
         logger.info(f"User {user_id} information retrieved successfully")
-        return ApiResponse(status="success", data={"user": user})
+        return success_response({"user": user})
     logger.error(f"User {user_id} not found")
     raise HTTPException(status_code=404, detail="User not found")
 
+@api_routes.get("/user/{user_id}/bundle", response_model=ApiResponse)
+async def get_user_bundle(
+    user_id: int,
+    user_repo: UserRepository = Depends(get_user_repo),
+    profile_repo: ProfileRepository = Depends(get_profile_repo),
+    resume_repo: ResumeRepository = Depends(get_resume_repo),
+):
+    """Returns the user with all of their profiles and resumes in one response.
+
+    Replaces the three requests the dashboard makes on load. The lookups go through the
+    per-table read caches and run concurrently; a single JOIN would repeat every resume
+    once per profile.
+    """
+    user, profiles, resumes = await asyncio.gather(
+        user_repo.aget_by_id(user_id),
+        profile_repo.aget_by_user_id(user_id),
+        resume_repo.aget_by_user_id(user_id),
+    )
+    if not user:
+        logger.error(f"User {user_id} not found")
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info(f"Bundle retrieved for user {user_id}")
+    return success_response({"user": user, "profiles": profiles, "resumes": resumes})
+
 @api_routes.patch("/user/{user_id}", response_model=ApiResponse)
 async def update_user_settings(
     user_id: int,
@@ -93,12 +204,12 @@ async def update_user_settings(
 
     logger.info(f"Update settings request for user ID: {user_id}")
 
-    existing_user = user_repo.get_by_id(user_id)
+    existing_user = await user_repo.aget_by_id(user_id)
     if not existing_user:
         logger.error(f"Update settings failed: User {user_id} not found")
         raise HTTPException(status_code=404, detail="User not found")
 
-    update_data = update_payload.dict(exclude_unset=True)
+    update_data = update_payload.model_dump(exclude_unset=True)
 
 
     if 'phone' in update_data and update_data['phone'] == "":
@@ -107,15 +218,15 @@ async def update_user_settings(
     if not update_data:
          logger.warning(f"No update data provided in the request for user ID: {user_id}")
 
-    result = user_repo.update(user_id, update_data)
+    result = await user_repo.aupdate(user_id, update_data)
 
     if result["status"] == "success":
         logger.info(f"Settings updated successfully for user ID: {user_id}")
-        updated_user_data = user_repo.get_by_id(user_id)
+        updated_user_data = await user_repo.aget_by_id(user_id)
         if updated_user_data and 'password' in updated_user_data:
              del updated_user_data['password']
 
-        return ApiResponse(status="success", message=result.get("message", "Settings updated"), data={"user": updated_user_data})
+        return success_response({"user": updated_user_data}, message=result.get("message", "Settings updated"))
     else:
         logger.error(f"Failed to update settings for user ID: {user_id}: {result['message']}")
         if "not found" in result.get("message", "").lower():
@@ -126,16 +237,18 @@ async def update_user_settings(
 
 
 @api_routes.post("/profile", response_model=ApiResponse)
-async def new_profile(profile: profileModel, user_repo: UserRepository = Depends(get_user_repo), profile_repo: ProfileRepository = Depends(get_profile_repo)):
-    if not user_repo.get_by_id(profile.user_id):
-        logger.error(f"User {profile.user_id} not found")
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    result = profile_repo.create(profile.dict())
+async def new_profile(profile: profileModel, profile_repo: ProfileRepository = Depends(get_profile_repo)):
+    # The profile.user_id foreign key rejects unknown users, so no separate lookup is needed
+    # Every field is a scalar, so a shallow copy of the validated fields equals model_dump()
+    # and is reused for both the insert and the response
+    profile_data = dict(profile.__dict__)
+    result = await profile_repo.acreate(profile_data)
     if result["status"] == "success":
         logger.info(f"Profile created for user {profile.user_id}")
-        return ApiResponse(status="success", data={"new_profile_id": result["profile_id"], "user": profile.dict()})
+        return success_response({"new_profile_id": result["profile_id"], "user": profile_data})
     logger.error(f"Failed to create profile for user {profile.user_id}: {result['message']}")
+    if result["message"] == "User not found":
+        raise HTTPException(status_code=404, detail="User not found")
     raise HTTPException(status_code=400, detail="Profile creation failed")
 
 @api_routes.post("/pdf-resume", response_model=ApiResponse)
@@ -154,10 +267,7 @@ async def get_pdf_resume(pdf: UploadFile = File(...)):
 
     try:
         profile = await convert_pdf_to_json(pdf)
-        return ApiResponse(
-            status="success",
-            data={"resume_data": profile.dict()}
-        )
+        return success_response({"resume_data": profile.model_dump()})
     except RuntimeError as e:
         logger.error(f"PDF conversion failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"PDF conversion failed: {str(e)}")
@@ -165,33 +275,40 @@ async def get_pdf_resume(pdf: UploadFile = File(...)):
 
 @api_routes.get("/profile/{user_id}", response_model=ApiResponse)
 async def get_profile_by_userid(user_id: int, profile_repo: ProfileRepository = Depends(get_profile_repo)):
-    profiles = profile_repo.get_by_user_id(user_id)
+    profiles = await profile_repo.aget_by_user_id(user_id)
     if profiles:
         logger.info(f"Profiles retrieved for user {user_id}")
-        return ApiResponse(status="success", data={"profiles": profiles})
-    else:
-        return ApiResponse(status="success", data={"profiles": []})
+    return success_response({"profiles": profiles})
 
 
 @api_routes.post("/profile/{user_id}/new_resume", response_model=ApiResponse)
-async def new_resumes(new_resume: NewResume, user_repo: UserRepository = Depends(get_user_repo), resume_service: ResumeService = Depends(get_resume_service)):
-    if not user_repo.get_by_id(new_resume.user_id):
-        logger.error(f"User {new_resume.user_id} not found")
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def new_resumes(new_resume: NewResume, resume_service: ResumeService = Depends(get_resume_service)):
     result = await resume_service.create_resume(new_resume)
     logger.info(f"Resume created for user {new_resume.user_id}")
-    return ApiResponse(status="success", data={"resume_id": result["resume_id"], "message": result["message"]})
+    return success_response({"resume_id": result["resume_id"], "created_at": result["created_at"], "message": result["message"]})
+
+@api_routes.post("/profile/{user_id}/new_resume/stream")
+async def stream_new_resume(new_resume: NewResume, resume_service: ResumeService = Depends(get_resume_service)):
+    """Streams the generated LaTeX as plain text while Gemini produces it.
 
-@api_routes.get("/profile/{user_id}/new_resume/{resume_id}/pdf")
+    The resume is saved once the stream completes and then shows up in the resume list.
+    """
+    logger.info(f"Streaming resume generation for user {new_resume.user_id}")
+    return await resume_service.stream_resume(new_resume)
+
+@api_routes.get("/profile/{user_id}/new_resume/{resume_id}/pdf", response_class=Response)
 async def get_resume_pdf(user_id: int, resume_id: int, resume_repo: ResumeRepository = Depends(get_resume_repo)):
-    user_resume = resume_repo.get_by_id(resume_id)
+    user_resume = await resume_repo.aget_by_id(resume_id)
     if not user_resume:
         logger.error(f"Resume {resume_id} not found for user {user_id}")
         raise HTTPException(status_code=404, detail="User resume not found")
 
     try:
-        pdf_response = await convert_latex_to_pdf(user_resume['new_resume'], output_filename=f"resume_{user_id}_{resume_id}")
+        pdf_response = await convert_latex_to_pdf(
+            user_resume['new_resume'],
+            output_filename=f"resume_{user_id}_{resume_id}",
+            headers={"X-Resume-ID": str(resume_id)},
+        )
         logger.info(f"PDF generated for resume {resume_id} of user {user_id}")
         return pdf_response
     except RuntimeError as e:
@@ -200,20 +317,16 @@ async def get_resume_pdf(user_id: int, resume_id: int, resume_repo: ResumeReposi
 
 @api_routes.get("/profile/{user_id}/new_resume/{resume_id}", response_model=ApiResponse)
 async def get_resume_by_resumeid(user_id: int, resume_id: int, resume_repo: ResumeRepository = Depends(get_resume_repo)):
-    user_resume = resume_repo.get_by_id(resume_id)
+    user_resume = await resume_repo.aget_by_id(resume_id)
     if user_resume:
         logger.info(f"Resume {resume_id} retrieved for user {user_id}")
-        return ApiResponse(status="success", data={"resume": user_resume})
+        return success_response({"resume": user_resume})
     logger.error(f"Resume {resume_id} not found for user {user_id}")
     raise HTTPException(status_code=404, detail="User resume not found")
 
 @api_routes.get("/profile/{user_id}/new_resume", response_model=ApiResponse)
 async def get_all_resume_by_userid(user_id: int, resume_repo: ResumeRepository = Depends(get_resume_repo)):
-    resumes = resume_repo.get_by_user_id(user_id)
+    resumes = await resume_repo.aget_by_user_id(user_id)
     if resumes:
         logger.info(f"All resumes retrieved for user {user_id}")
-        return ApiResponse(status="success", data={"resumes": resumes})
-    else:
-        return ApiResponse(status="success", data={"resumes": []})
-    logger.error(f"No resumes found for user {user_id}")
-    raise HTTPException(status_code=404, detail="User resumes not found")
\ No newline at end of file
+    return success_response({"resumes": resumes})
\ No newline at end of file
@@ -1 +1,2 @@
-from app.core.database.config import UserRepository, ProfileRepository, ResumeRepository
\ No newline at end of file
+from app.core.database.config import init_db, get_db_connection, close_db_connections
+from app.core.database.repositories import UserRepository, ProfileRepository, ResumeRepository
\ No newline at end of file
@@ -0,0 +1,356 @@
+import asyncio
+import sqlite3
+import os
+import bcrypt
+import logging
+import orjson
+import threading
+from functools import lru_cache
+from cachetools import TTLCache
+from fastapi.concurrency import run_in_threadpool
+from app.core.database.config import PROFILE_FIELDS, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# bcrypt work factor for new hashes; existing hashes carry their own cost and still verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+class ReadCache:
+    """Thread-safe TTL cache for repository reads, keyed by user id.
+
+    Caches are per process and every write path invalidates only the local entry, so they
+    are safe for single-process deployments only. A ttl of 0 (the default) disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.enabled = ttl > 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=max(ttl, 1))
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Off by default: a write through one worker process would not invalidate another's copy.
+# Set these (e.g. 60 and 30) only when the app runs as a single process.
+READ_CACHE_TTL = int(os.getenv("READ_CACHE_TTL", "0"))
+# User rows are read on nearly every request; size this to ~1.5x the active users
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "0"))
+
+user_cache = ReadCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+profile_list_cache = ReadCache(maxsize=10_000, ttl=READ_CACHE_TTL)
+resume_list_cache = ReadCache(maxsize=10_000, ttl=READ_CACHE_TTL)
+
+# Explicit column lists for reads; rows come back as sqlite3.Row and become dicts by name
+USER_COLUMNS = "id, name, email, phone, created_at"
+PROFILE_FIELD_NAMES = tuple(field["name"] for field in PROFILE_FIELDS)
+PROFILE_JSON_FIELDS = tuple(field["name"] for field in PROFILE_FIELDS if field["is_json"])
+PROFILE_COLUMNS = ", ".join(["id", "user_id", "profile_name", *PROFILE_FIELD_NAMES, "created_at"])
+
+# All SQL is built once at import, so every call sends the same text and hits the
+# connection's prepared-statement cache (cached_statements) instead of re-parsing
+USER_BY_EMAIL_SQL = f"SELECT {USER_COLUMNS}, password FROM user WHERE email=?"
+USER_BY_ID_SQL = f"SELECT {USER_COLUMNS} FROM user WHERE id=?"
+# A duplicate email returns no row instead of raising, so signup never takes the exception path
+USER_INSERT_SQL = (
+    "INSERT INTO user (name, email, password, phone) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(email) DO NOTHING RETURNING id"
+)
+PROFILES_BY_USER_SQL = f"SELECT {PROFILE_COLUMNS} FROM profile WHERE user_id=?"
+PROFILE_BY_ID_SQL = f"SELECT {PROFILE_COLUMNS} FROM profile WHERE id=?"
+PROFILE_INSERT_SQL = (
+    f"INSERT INTO profile (user_id, profile_name, {', '.join(PROFILE_FIELD_NAMES)}) "
+    f"VALUES ({', '.join('?' * (len(PROFILE_FIELD_NAMES) + 2))})"
+)
+PROFILE_INSERT_RETURNING_SQL = f"{PROFILE_INSERT_SQL} RETURNING id"
+RESUME_COLUMNS = "id, user_id, user_resume_id, name, job_title, job_description, new_resume, created_at"
+# The resume list only renders metadata; the generated LaTeX is fetched per resume
+RESUME_SUMMARY_COLUMNS = "id, user_id, user_resume_id, name, job_title, job_description, created_at"
+RESUME_INSERT_SQL = (
+    "INSERT INTO new_resume (user_id, user_resume_id, name, job_title, job_description, new_resume) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+RESUME_INSERT_RETURNING_SQL = f"{RESUME_INSERT_SQL} RETURNING id, created_at"
+RESUMES_BY_USER_SQL = f"SELECT {RESUME_SUMMARY_COLUMNS} FROM new_resume WHERE user_id=?"
+RESUME_BY_ID_SQL = f"SELECT {RESUME_COLUMNS} FROM new_resume WHERE id=?"
+
+@lru_cache(maxsize=64)
+def _user_update_sql(columns: tuple[str, ...]) -> str:
+    """Builds the UPDATE for a set of columns; memoized so each combination is formatted once."""
+    return f"UPDATE user SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?"
+
+# Caps concurrent repository calls so a burst of slow ones (bcrypt on login/signup) cannot
+# occupy every worker of Starlette's anyio threadpool (40 threads) and starve the rest of
+# the offloaded work
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "16"))
+_db_semaphore = asyncio.Semaphore(DB_CONCURRENCY)
+
+class AsyncRepoMixin:
+    """Async counterparts of the repository methods for use from the event loop.
+
+    SQLite I/O, bcrypt and JSON (de)serialization all block, so the ``a*`` methods run
+    the sync ones in Starlette's threadpool. Scripts can keep calling the sync API directly.
+    """
+
+    async def _run(self, fn, *args, **kwargs):
+        """Runs a blocking call in the threadpool, at most DB_CONCURRENCY at a time."""
+        async with _db_semaphore:
+            return await run_in_threadpool(fn, *args, **kwargs)
+
+class BaseRepository(AsyncRepoMixin):
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def fetch_one(self, query, params):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+    def fetch_all(self, query, params):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def insert(self, query, params):
+        """Runs an INSERT ... RETURNING id statement and returns the new row's id."""
+        return self.insert_returning(query, params)[0]
+
+    def insert_returning(self, query, params):
+        """Runs an INSERT ... RETURNING statement and returns the returned row."""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            conn.commit()
+            return row
+
+class UserRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("user")
+
+    async def acheck_login(self, email: str, password: str):
+        return await self._run(self.check_login, email, password)
+
+    async def asignup(self, name: str, email: str, password: str, phone: str):
+        return await self._run(self.signup, name, email, password, phone)
+
+    async def aget_by_id(self, user_id: int):
+        return await self._run(self.get_by_id, user_id)
+
+    async def aupdate(self, user_id: int, update_data: dict):
+        return await self._run(self.update, user_id, update_data)
+
+    def check_login(self, email: str, password: str):
+        logger.debug("Checking login for email: %s", email)
+        user = self.fetch_one(USER_BY_EMAIL_SQL, (email,))
+        if user and bcrypt.checkpw(password.encode('utf-8'), user["password"].encode('utf-8')):
+            logger.info(f"Successful login for email: {email}")
+            user_data = dict(user)
+            del user_data["password"]
+            # The SPA fetches /user/{id} right after login; warm the cache for it
+            user_cache.set(user_data["id"], user_data)
+            return {"status": "success", "user": dict(user_data)}
+        logger.warning(f"Failed login attempt for email: {email}")
+        return {"status": "error", "message": "Invalid credentials"}
+
+    def signup(self, name: str, email: str, password: str, phone: str):
+        logger.debug("Attempting signup for email: %s", email)
+        hashed_password = hash_password(password)
+        if self.insert_returning(USER_INSERT_SQL, (name, email, hashed_password, phone)) is None:
+            logger.error(f"Signup failed for email: {email} - User already exists")
+            return {"status": "error", "message": "User already exists"}
+        logger.info(f"Successful signup for email: {email}")
+        return {"status": "success", "user": {"name": name, "email": email}}
+
+    def get_by_id(self, user_id: int):
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+        user = self.fetch_one(USER_BY_ID_SQL, (user_id,))
+        if user:
+            result = dict(user)
+            user_cache.set(user_id, result)
+            return dict(result)
+        return None
+
+    def update(self, user_id: int, update_data: dict):
+        logger.debug("Attempting to update user ID: %s with data: %s", user_id, list(update_data.keys()))
+
+        if not update_data:
+            logger.warning(f"No update data provided for user ID: {user_id}")
+            return {"status": "success", "message": "No changes provided."}
+
+        if 'password' in update_data and update_data['password']:
+            try:
+                hashed_password = hash_password(update_data['password'])
+                update_data['password'] = hashed_password
+                logger.debug("Password hashed for user ID: %s", user_id)
+            except Exception as e:
+                logger.error(f"Password hashing failed for user ID: {user_id}: {str(e)}")
+                return {"status": "error", "message": "Password hashing failed"}
+        elif 'password' in update_data:
+            del update_data['password']
+            if not update_data:
+                logger.warning(f"Password was blank, no other changes provided for user ID: {user_id}")
+                return {"status": "success", "message": "No effective changes provided."}
+
+        query = _user_update_sql(tuple(update_data.keys()))
+        params = list(update_data.values()) + [user_id]
+
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, tuple(params))
+                conn.commit()
+                user_cache.invalidate(user_id)
+                if cursor.rowcount == 0:
+                    logger.warning(f"Update attempt for non-existent user ID: {user_id}")
+                    return {"status": "error", "message": "User not found or no changes made"}
+                logger.info(f"User ID: {user_id} updated successfully. Fields: {list(update_data.keys())}")
+                return {"status": "success", "message": "User updated successfully"}
+        except sqlite3.Error as e:
+            logger.error(f"Database error updating user ID: {user_id} - {str(e)}")
+            return {"status": "error", "message": f"Database error: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Unexpected error updating user ID: {user_id} - {str(e)}")
+            return {"status": "error", "message": "An unexpected error occurred"}
+
+class ProfileRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("profile")
+
+    async def acreate(self, profile_data: dict):
+        return await self._run(self.create, profile_data)
+
+    async def aget_by_user_id(self, user_id: int):
+        return await self._run(self.get_by_user_id, user_id)
+
+    async def aget_by_id(self, profile_id: int):
+        return await self._run(self.get_by_id, profile_id)
+
+    def create(self, profile_data: dict):
+        logger.debug("Creating profile for user_id: %s", profile_data['user_id'])
+        try:
+            profile_id = self.insert(PROFILE_INSERT_RETURNING_SQL, self._serialize_profile(profile_data))
+            profile_list_cache.invalidate(profile_data['user_id'])
+            logger.info(f"Profile created successfully for user_id: {profile_data['user_id']}")
+            return {"status": "success", "message": "Profile created successfully", "profile_id": profile_id}
+        except sqlite3.IntegrityError as e:
+            logger.error(f"Failed to create profile for user_id: {profile_data['user_id']} - {str(e)}")
+            if "FOREIGN KEY" in str(e):
+                return {"status": "error", "message": "User not found"}
+            return {"status": "error", "message": str(e)}
+        except sqlite3.Error as e:
+            logger.error(f"Failed to create profile for user_id: {profile_data['user_id']} - {str(e)}")
+            return {"status": "error", "message": str(e)}
+        except orjson.JSONEncodeError as e:
+            logger.error(f"JSON serialization failed for profile data: {str(e)}")
+            return {"status": "error", "message": "Invalid data format"}
+
+    def _serialize_profile(self, profile_data: dict) -> list:
+        """Builds the INSERT parameters, JSON-encoding structured fields; missing fields become NULL."""
+        values = [profile_data['user_id'], profile_data['profile_name']]
+        for name in PROFILE_FIELD_NAMES:
+            value = profile_data.get(name)
+            if value is not None and name in PROFILE_JSON_FIELDS:
+                value = orjson.dumps(value).decode('utf-8')
+            values.append(value)
+        return values
+
+    def get_by_user_id(self, user_id: int):
+        cached = profile_list_cache.get(user_id)
+        if cached is not None:
+            return list(cached)
+        profiles = self.fetch_all(PROFILES_BY_USER_SQL, (user_id,))
+        # _deserialize_profile returns None for rows with corrupt JSON; leave those out of the list
+        result = [profile for profile in map(self._deserialize_profile, profiles) if profile is not None]
+        profile_list_cache.set(user_id, result)
+        return list(result)
+
+    def get_by_id(self, profile_id: int):
+        profile = self.fetch_one(PROFILE_BY_ID_SQL, (profile_id,))
+        if profile:
+            return self._deserialize_profile(profile)
+        return None
+
+    def _deserialize_profile(self, profile: sqlite3.Row) -> dict:
+        """Deserialize profile data from database row."""
+        try:
+            result = dict(profile)
+            for name in PROFILE_JSON_FIELDS:
+                if result[name]:
+                    result[name] = orjson.loads(result[name])
+            return result
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to deserialize profile ID {profile['id']}: {str(e)}")
+            return None
+
+class ResumeRepository(BaseRepository):
+    def __init__(self):
+        super().__init__("new_resume")
+
+    async def acreate(self, resume_data: dict):
+        return await self._run(self.create, resume_data)
+
+    async def aget_by_user_id(self, user_id: int):
+        return await self._run(self.get_by_user_id, user_id)
+
+    async def aget_by_id(self, resume_id: int):
+        return await self._run(self.get_by_id, resume_id)
+
+    def create(self, resume_data: dict):
+        logger.debug("Creating resume for user_id: %s", resume_data['user_id'])
+        try:
+            resume_id, created_at = self.insert_returning(RESUME_INSERT_RETURNING_SQL, self._resume_values(resume_data))
+            resume_list_cache.invalidate(resume_data['user_id'])
+            logger.info(f"Resume created successfully for user_id: {resume_data['user_id']}")
+            return {
+                "status": "success", "message": "Resume created successfully",
+                "resume_id": resume_id, "created_at": created_at
+            }
+        except sqlite3.Error as e:
+            logger.error(f"Failed to create resume for user_id: {resume_data['user_id']} - {str(e)}")
+            return {"status": "error", "message": str(e)}
+
+    def _resume_values(self, resume_data: dict) -> tuple:
+        return (
+            resume_data['user_id'], resume_data['user_resume_id'], resume_data['name'], resume_data['job_title'],
+            resume_data['job_description'], resume_data['new_resume']
+        )
+
+    def get_by_user_id(self, user_id: int):
+        cached = resume_list_cache.get(user_id)
+        if cached is not None:
+            return list(cached)
+        resumes = self.fetch_all(RESUMES_BY_USER_SQL, (user_id,))
+        result = [dict(r) for r in resumes]
+        resume_list_cache.set(user_id, result)
+        return list(result)
+
+    def get_by_id(self, resume_id: int):
+        resume = self.fetch_one(RESUME_BY_ID_SQL, (resume_id,))
+        if resume:
+            return dict(resume)
+        return None
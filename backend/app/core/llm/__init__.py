@@ -1,12 +1,52 @@
 import base64
+import httpx
 from google import genai
 from google.genai import types
-from dotenv import load_dotenv
 import os
+import re
+from functools import lru_cache
+from typing import AsyncIterator
 from app.core.logs import logger
-load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Every LLM call goes through client.aio; keep its pooled HTTPS connections alive between
+# requests so warm traffic doesn't pay a TLS handshake per call
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "50"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(
+        async_client_args={
+            "limits": httpx.Limits(
+                max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            )
+        }
+    )
+)
+
+# Markdown code fences the model wraps around LaTeX/JSON output; matched only at the ends so
+# the body (which may legitimately contain "json" or backticks) is never touched
+_FENCE_RE = re.compile(r"\A\s*```(?:latex|json)?[ \t]*\n?|\n?```\s*\Z")
+
+def strip_code_fences(text: str) -> str:
+    """Removes a leading ```latex/```json fence and a trailing ``` from model output."""
+    return _FENCE_RE.sub("", text).strip()
+
+MODEL_NAME = 'gemini-2.0-flash-001'
+PDF_MODEL_NAME = 'gemini-2.0-flash'
+
+@lru_cache(maxsize=32)
+def generation_config(system_prompt: str, temperature: float, max_output_tokens: int) -> types.GenerateContentConfig:
+    """Returns the shared GenerateContentConfig for a (system_prompt, temperature, max_output_tokens) tuple.
+
+    The system prompt travels as the config's system_instruction, so each prompt/settings
+    combination is built once and reused like a preconfigured model.
+    """
+    return types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens
+    )
 
 async def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.5, max_output_tokens: int = 20000) -> str:
     """Generates content based on the provided prompts and settings.
@@ -20,20 +60,40 @@ async def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.
     Returns:
         str: The generated text response.
     """
-    response =  client.models.generate_content(
-        model='gemini-2.0-flash-001',
+    response = await client.aio.models.generate_content(
+        model=MODEL_NAME,
         contents=[
-            types.Part.from_text(text=system_prompt),
             types.Part.from_text(text=user_prompt)
         ],
-        config=types.GenerateContentConfig(
-            temperature=temperature,
-            max_output_tokens=max_output_tokens
-        )
+        config=generation_config(system_prompt, temperature, max_output_tokens)
     )
     return response.text
 
 
+async def text_gen_stream(system_prompt: str, user_prompt: str, temperature: float = 0.5, max_output_tokens: int = 20000) -> AsyncIterator[str]:
+    """Generates content like text_gen, but yields the text as it is produced.
+
+    Args:
+        system_prompt (str): The instruction for the system.
+        user_prompt (str): The user's input prompt.
+        temperature (float): Controls the randomness of the output.
+        max_output_tokens (int): Maximum number of tokens in the output.
+
+    Yields:
+        str: The next chunk of generated text.
+    """
+    stream = await client.aio.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=[
+            types.Part.from_text(text=user_prompt)
+        ],
+        config=generation_config(system_prompt, temperature, max_output_tokens)
+    )
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
+
+
 async def text_gen_with_context(system_prompt: str, user_prompt: str, context: str, temperature: float = 0.5, max_output_tokens: int = 1500) -> str:
     """Generates content based on the provided prompts, context, and settings.
 
@@ -47,22 +107,18 @@ async def text_gen_with_context(system_prompt: str, user_prompt: str, context: s
     Returns:
         str: The generated text response.
     """
-    response =  client.models.generate_content(
-        model='gemini-2.0-flash-001',
+    response = await client.aio.models.generate_content(
+        model=MODEL_NAME,
         contents=[
-            types.Part.from_text(text=system_prompt),
             types.Part.from_text(text=user_prompt),
             types.Part.from_text(text=context)
         ],
-        config=types.GenerateContentConfig(
-            temperature=temperature,
-            max_output_tokens=max_output_tokens
-        )
+        config=generation_config(system_prompt, temperature, max_output_tokens)
     )
     return response.text
 
 
-def text_gen_pdf(system_prompt: str, user_prompt: str, pdf_byte: str, temperature: float = 0.5, max_output_tokens: int = 10000) -> str:
+async def text_gen_pdf(system_prompt: str, user_prompt: str, pdf_byte: str, temperature: float = 0.5, max_output_tokens: int = 10000) -> str:
     """Generates content based on the provided prompts, image, and settings.
 
     Args:
@@ -76,23 +132,18 @@ def text_gen_pdf(system_prompt: str, user_prompt: str, pdf_byte: str, temperatur
         str: The generated text response.
     """
     
-    response = client.models.generate_content(
-            model='gemini-2.0-flash',
+    response = await client.aio.models.generate_content(
+            model=PDF_MODEL_NAME,
             contents=[
-                types.Part.from_text(text=system_prompt),
                 types.Part.from_text(text=user_prompt),
                 types.Part.from_bytes(
         data=pdf_byte,
         mime_type='application/pdf',
       ),
             ],
-            config=types.GenerateContentConfig(
-                temperature=temperature,
-                max_output_tokens=max_output_tokens
-            )
+            config=generation_config(system_prompt, temperature, max_output_tokens)
         )
-    response_text = response.text
-    response_text = response_text.replace("```", "").replace("json", "").strip()
-    print(f"Response Text: {response_text[:30]}...")  # Print first 30 chars for debugging
+    response_text = strip_code_fences(response.text)
+    logger.debug("Response text: %s...", response_text[:30])
     return response_text
 
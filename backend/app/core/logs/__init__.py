@@ -1,14 +1,26 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 
+# Request handlers only enqueue records; a background thread does the file and console writes
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    log_queue,
+    logging.FileHandler("log.txt"),
+    logging.StreamHandler(),  # Optional: keep console output
+    respect_handler_level=True,
+)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("log.txt"),
-        logging.StreamHandler()  # Optional: keep console output
-    ]
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 
+# Debug calls pass their values as %s arguments rather than f-strings, so an INFO-level
+# deployment never formats (or stringifies whole LaTeX sources for) messages it discards
 logger = logging.getLogger(__name__)
@@ -1,2 +1,2 @@
-from app.core.service.createresume import create_resume, convert_latex_to_pdf
+from app.core.service.createresume import create_resume, create_resume_stream, convert_latex_to_pdf, warm_latex_format
 from app.core.service.readresume import convert_pdf_to_json
\ No newline at end of file
@@ -1,154 +1,504 @@
 import asyncio
-from app.core.llm import text_gen
-import subprocess
+import atexit
+import hashlib
+import orjson
+import os
+import shutil
+from cachetools import TTLCache
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from app.core.llm import strip_code_fences, text_gen, text_gen_stream
 from pathlib import Path
-from fastapi.responses import StreamingResponse
-import io
+from fastapi.responses import FileResponse, Response
 import tempfile
 from app.core.logs import logger
 
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", Path(tempfile.gettempdir()) / "ats-friend-pdf-cache"))
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "256"))
+# Compiles currently running, so a download and a warm-up of the same LaTeX share one pdflatex run
+_pdf_compiles: dict[str, asyncio.Future] = {}
 
-async def create_resume(resume_data: dict, job_title: str, job_description: str) -> str:
-    """
-    Generates a one-page ATS-friendly LaTeX resume, tailored to a specific job using a blue and black color scheme.
-    """
-    system_prompt = (
-        "You are a professional LaTeX resume generator. Your task is to generate a polished, one-page resume in LaTeX format using only standard packages. "
-        "Strictly follow these formatting and tailoring rules:\n"
-        "1. Use only these LaTeX packages: article, geometry, amsmath, amssymb, enumitem, ragged2e, multicol, xcolor, helvet.\n"
-        "2. The resume must fit a single A4 page with compact margins using \\geometry{margin=0.7in} and have a balanced layout with no excessive white space.\n"
-        "3. Set font to Helvetica using \\usepackage{helvet} and \\renewcommand{\\familydefault}{\\sfdefault}.\n"
-        "4. Use \\definecolor{cvblue}{RGB}{0,102,204} for section headings and bullet accents. All body text must be black.\n"
-        "5. Sections: Personal Info, Objective, Education, Work Experience, Skills, Certifications, Projects, Hobbies, Languages.\n"
-        "6. For each section, apply:\n"
-        "   - Section titles in cvblue, bold, with spacing optimized for compactness.\n"
-        "   - Personal Info: Centered name in bold, large font; email, phone, links below.\n"
-        "   - Objective: One concise sentence summarizing experience, goals, and match with the job.\n"
-        "   - Education & Work Experience: Use bold for title/degree, italics for company/institution, right-aligned dates, bullets for details.\n"
-        "   - Skills: Bullet-pointed technical and soft skills, grouped and matched to the job.\n"
-        "   - Projects: Bold titles, right-aligned date, bullets for impact and relevance.\n"
-        "   - Only include non-empty sections; do not generate empty environments (e.g., \\begin{itemize} \\end{itemize}).\n"
-        "7. Tailoring:\n"
-        "   - Prioritize and emphasize content most relevant to the job description.\n"
-        "   - You may reorder sections to highlight alignment with the job.\n"
-        "   - Compress, merge, or drop less relevant experiences if space is tight.\n"
-        "   - Match technical terms, skills, and achievements to the job description using clear, concise language.\n"
-        "   - Do NOT include the job title or description text in the output.\n"
-        "8. Final output must be complete, compilable with pdflatex, and free of errors, comments, or explanations.\n"
-        "9. Donot include page numbers or any empty lines. Donnot include any N/A or Null if not present dont include. \n"
-        "10. Ensure the output is concise, professional, and visually balanced.\n"
-        "11. Ensure the page has proper white space and is not too crowded. make sure everything is left aligned \n"
-    )
+# pdflatex formats dumped from previously seen preambles, keyed by the preamble's hash
+LATEX_FORMAT_DIR = Path(os.getenv("LATEX_FORMAT_DIR", Path(tempfile.gettempdir()) / "ats-friend-latex-formats"))
+LATEX_FORMAT_MAX_FILES = int(os.getenv("LATEX_FORMAT_MAX_FILES", "32"))
+_format_builds: set[str] = set()
+# Preambles whose dump failed to compile a document; these always compile from scratch
+_broken_formats: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+# zlib level 1 instead of pdflatex's default 9: several times less compression CPU for a
+# slightly larger one-page PDF. Prepended to every source and baked into dumped formats
+PDF_COMPRESSION_SETTINGS = "\\pdfcompresslevel=1\n"
+# Fail on the first error instead of running on (or up to the timeout) on broken model output
+PDFLATEX_FLAGS = ["-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape"]
+
+# Compiles check out one of these reusable work directories instead of creating and removing a
+# temporary directory each time. The pool size also caps how many pdflatex runs share the CPU
+LATEX_WORKDIRS = int(os.getenv("LATEX_WORKDIRS", str(os.cpu_count() or 4)))
+# pdflatex makes many small writes to its .aux/.log files; keep them on tmpfs where available
+LATEX_WORK_ROOT = os.getenv("LATEX_WORK_ROOT") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+)
+# An asyncio.Queue belongs to the event loop that first waits on it; the pool is rebuilt over
+# the same directories when another loop (a restarted server, a test) checks one out
+_workdir_pool: asyncio.Queue | None = None
+_workdir_pool_loop: asyncio.AbstractEventLoop | None = None
+_workdirs: list[Path] = []
+
+@atexit.register
+def _remove_workdirs() -> None:
+    for workdir in _workdirs:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# The model is told to open every resume with exactly this preamble, so its format can be
+# built once at startup and nearly every compile skips package loading
+RESUME_PREAMBLE = (
+    "\\documentclass{article}\n"
+    "\\usepackage{geometry}\n"
+    "\\geometry{a4paper, margin=0.7in}\n"
+    "\\usepackage{amsmath}\n"
+    "\\usepackage{amssymb}\n"
+    "\\usepackage{enumitem}\n"
+    "\\usepackage{ragged2e}\n"
+    "\\usepackage{multicol}\n"
+    "\\usepackage{xcolor}\n"
+    "\\usepackage{helvet}\n"
+    "\\renewcommand{\\familydefault}{\\sfdefault}\n"
+    "\\definecolor{cvblue}{RGB}{0,102,204}\n"
+    "\\pagestyle{empty}"
+)
+
+# Generated LaTeX keyed by a hash of (resume data, job title, job description), so regenerating
+# the same resume for the same job skips Gemini; the PDF cache above then skips pdflatex too
+RESUME_CACHE_TTL = int(os.getenv("RESUME_CACHE_TTL", "86400"))
+RESUME_CACHE_SIZE = int(os.getenv("RESUME_CACHE_SIZE", "512"))
+# Only touched from the event loop, so no lock is needed
+resume_cache = TTLCache(maxsize=RESUME_CACHE_SIZE, ttl=RESUME_CACHE_TTL)
+# Generations currently waiting on Gemini, so identical concurrent requests share one call
+_resume_generations: dict[str, asyncio.Future] = {}
 
+def resume_cache_key(resume_data: dict, job_title: str, job_description: str) -> str:
+    payload = orjson.dumps([resume_data, job_title, job_description], option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+# Built once at import; only the user prompt varies per request
+RESUME_SYSTEM_PROMPT = (
+    "You are a professional LaTeX resume generator. Your task is to generate a polished, one-page resume in LaTeX format using only standard packages. "
+    "Strictly follow these formatting and tailoring rules:\n"
+    "0. Begin the document with exactly this preamble, unchanged, immediately followed by \\begin{document}. "
+    "Put any custom commands after \\begin{document}, never in the preamble:\n"
+    + RESUME_PREAMBLE + "\n"
+    "1. Use only these LaTeX packages: article, geometry, amsmath, amssymb, enumitem, ragged2e, multicol, xcolor, helvet.\n"
+    "2. The resume must fit a single A4 page with compact margins using \\geometry{margin=0.7in} and have a balanced layout with no excessive white space.\n"
+    "3. Set font to Helvetica using \\usepackage{helvet} and \\renewcommand{\\familydefault}{\\sfdefault}.\n"
+    "4. Use \\definecolor{cvblue}{RGB}{0,102,204} for section headings and bullet accents. All body text must be black.\n"
+    "5. Sections: Personal Info, Objective, Education, Work Experience, Skills, Certifications, Projects, Hobbies, Languages.\n"
+    "6. For each section, apply:\n"
+    "   - Section titles in cvblue, bold, with spacing optimized for compactness.\n"
+    "   - Personal Info: Centered name in bold, large font; email, phone, links below.\n"
+    "   - Objective: One concise sentence summarizing experience, goals, and match with the job.\n"
+    "   - Education & Work Experience: Use bold for title/degree, italics for company/institution, right-aligned dates, bullets for details.\n"
+    "   - Skills: Bullet-pointed technical and soft skills, grouped and matched to the job.\n"
+    "   - Projects: Bold titles, right-aligned date, bullets for impact and relevance.\n"
+    "   - Only include non-empty sections; do not generate empty environments (e.g., \\begin{itemize} \\end{itemize}).\n"
+    "7. Tailoring:\n"
+    "   - Prioritize and emphasize content most relevant to the job description.\n"
+    "   - You may reorder sections to highlight alignment with the job.\n"
+    "   - Compress, merge, or drop less relevant experiences if space is tight.\n"
+    "   - Match technical terms, skills, and achievements to the job description using clear, concise language.\n"
+    "   - Do NOT include the job title or description text in the output.\n"
+    "8. Final output must be complete, compilable with pdflatex, and free of errors, comments, or explanations.\n"
+    "9. Donot include page numbers or any empty lines. Donnot include any N/A or Null if not present dont include. \n"
+    "10. Ensure the output is concise, professional, and visually balanced.\n"
+    "11. Ensure the page has proper white space and is not too crowded. make sure everything is left aligned \n"
+)
+
+RESUME_INSTRUCTIONS = (
+    "Generate a LaTeX resume tailored to the job described after the --- line, using the resume data given there.\n"
+    "Format the resume as follows:\n"
+    "- Personal Information (centered name in large bold, followed by email, phone, links).\n"
+    "- Objective: One-line statement aligned with the job title and description.\n"
+    "- Education: Degree (bold), Institution (italic), Dates (right-aligned), bullet points for details.\n"
+    "- Work Experience: Title (bold), Company (italic), Dates (right-aligned), bullets for responsibilities.\n"
+    "- Skills: Separate technical and soft skills as bullet points.\n"
+    "- Projects: Title (bold), Dates (right-aligned), bullets for impact and relevance.\n"
+    "- Certifications, Projects, Hobbies, Languages: Include only if available; use bullets and concise formatting.\n\n"
+    "Tailor the resume content to emphasize relevance to the job. Reorder or condense sections to maintain a clean, compact A4 single-page layout. "
+    "Match keywords, technologies, and impact statements to the job description wherever appropriate. Maintain ATS-friendliness by avoiding tables, images, hyperlinks, or non-standard constructs. "
+    "Ensure output is concise, professional, and visually balanced."
+)
+
+def build_resume_prompts(resume_data: dict, job_title: str, job_description: str) -> tuple[str, str]:
+    """Builds the system and user prompts for generating a tailored LaTeX resume."""
+    # Static instructions first and per-request data last, so consecutive calls share the longest
+    # possible prompt prefix and Gemini's implicit prompt cache can reuse it
     user_prompt = (
-        f"Generate a LaTeX resume tailored to this job:\n"
+        f"{RESUME_INSTRUCTIONS}\n"
+        "---\n"
         f"Job Title: {job_title}\n"
         f"Job Description: {job_description}\n"
         "Resume Data:\n"
-        f"{resume_data}\n\n"
-        "Format the resume as follows:\n"
-        "- Personal Information (centered name in large bold, followed by email, phone, links).\n"
-        "- Objective: One-line statement aligned with the job title and description.\n"
-        "- Education: Degree (bold), Institution (italic), Dates (right-aligned), bullet points for details.\n"
-        "- Work Experience: Title (bold), Company (italic), Dates (right-aligned), bullets for responsibilities.\n"
-        "- Skills: Separate technical and soft skills as bullet points.\n"
-        "- Projects: Title (bold), Dates (right-aligned), bullets for impact and relevance.\n"
-        "- Certifications, Projects, Hobbies, Languages: Include only if available; use bullets and concise formatting.\n\n"
-        "Tailor the resume content to emphasize relevance to the job. Reorder or condense sections to maintain a clean, compact A4 single-page layout. "
-        "Match keywords, technologies, and impact statements to the job description wherever appropriate. Maintain ATS-friendliness by avoiding tables, images, hyperlinks, or non-standard constructs. "
-        "Ensure output is concise, professional, and visually balanced."
+        # Compact JSON with sorted keys: fewer tokens than a dict repr, and identical profiles
+        # always serialize identically
+        f"{orjson.dumps(resume_data, option=orjson.OPT_SORT_KEYS, default=str).decode('utf-8')}"
     )
+    return RESUME_SYSTEM_PROMPT, user_prompt
+
+async def create_resume(resume_data: dict, job_title: str, job_description: str) -> str:
+    """
+    Generates a one-page ATS-friendly LaTeX resume, tailored to a specific job using a blue and black color scheme.
+    """
+    cache_key = resume_cache_key(resume_data, job_title, job_description)
+    cached = resume_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Resume cache hit, skipping generation")
+        return cached
+    generation = _resume_generations.get(cache_key)
+    if generation is None:
+        generation = asyncio.ensure_future(generate_resume(cache_key, resume_data, job_title, job_description))
+        _resume_generations[cache_key] = generation
+        generation.add_done_callback(lambda _: _resume_generations.pop(cache_key, None))
+    else:
+        logger.info("Identical resume generation in flight, waiting for it")
+    # Shielded so one client disconnecting does not cancel the call the others are waiting on
+    return await asyncio.shield(generation)
 
+async def generate_resume(cache_key: str, resume_data: dict, job_title: str, job_description: str) -> str:
+    system_prompt, user_prompt = build_resume_prompts(resume_data, job_title, job_description)
     generated_resume = await text_gen(system_prompt, user_prompt)
+    if generated_resume:
+        resume_cache[cache_key] = generated_resume
+        warm_pdf_cache(generated_resume)
     return generated_resume
 
-async def convert_latex_to_pdf(latex_code: str, output_filename: str = "resume") -> StreamingResponse:
-    """Converts LaTeX code to a PDF and returns it as a streaming response without saving to disk.
+async def create_resume_stream(resume_data: dict, job_title: str, job_description: str) -> AsyncIterator[str]:
+    """Same as create_resume, but yields the LaTeX in chunks as Gemini produces them."""
+    cache_key = resume_cache_key(resume_data, job_title, job_description)
+    cached = resume_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Resume cache hit, skipping generation")
+        yield cached
+        return
+    system_prompt, user_prompt = build_resume_prompts(resume_data, job_title, job_description)
+    chunks = []
+    async for chunk in text_gen_stream(system_prompt, user_prompt):
+        chunks.append(chunk)
+        yield chunk
+    # Only cache streams that ran to completion
+    if chunks:
+        generated_resume = "".join(chunks)
+        resume_cache[cache_key] = generated_resume
+        warm_pdf_cache(generated_resume)
+
+async def convert_latex_to_pdf(latex_code: str, output_filename: str = "resume", headers: dict | None = None) -> Response:
+    """Converts LaTeX code to a PDF and returns it as a response.
+
+    Compiled PDFs are moved straight from pdflatex's output directory into an on-disk
+    cache keyed by the hash of the LaTeX source, so repeat downloads skip pdflatex
+    entirely. The response is streamed from the cached file in chunks; the PDF is never
+    read into memory unless the cache is unwritable.
 
     Args:
         latex_code (str): The LaTeX code to convert.
         output_filename (str): The name of the output PDF file (for the response header).
+        headers (dict, optional): Extra headers to send with the PDF.
 
     Returns:
-        StreamingResponse: A FastAPI StreamingResponse containing the generated PDF.
+        Response: A FastAPI Response containing the generated PDF.
 
     Raises:
         RuntimeError: If pdflatex fails to generate the PDF.
     """
     # Clean LaTeX code
-    clean_latex_code = latex_code.replace("```latex", "").replace("```", "").strip()
-    logger.debug(f"Cleaned LaTeX code: {clean_latex_code}")
-    
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        tex_file = temp_path / f"{output_filename}.tex"
-        
-        logger.debug(f"Temporary directory: {temp_dir}")
-        logger.debug(f"TeX file path: {tex_file}")
-        
-        # Write LaTeX code to a temporary .tex file
-        with open(tex_file, "w", encoding="utf-8") as f:
-            f.write(clean_latex_code)
-        
-        try:
-            # Run pdflatex with nonstopmode and timeout
-            process = subprocess.run(
-                ["pdflatex", "-interaction=nonstopmode", f"-output-directory={temp_dir}", str(tex_file)],
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=30
-            )
-            
-            # Log pdflatex output
-            logger.debug(f"pdflatex stdout: {process.stdout}")
-            logger.debug(f"pdflatex stderr: {process.stderr}")
-            logger.debug(f"pdflatex exit code: {process.returncode}")
-            
-            # Check for pdflatex errors
-            if process.returncode != 0:
-                # Check log file for more details
-                log_file = temp_path / f"{output_filename}.log"
-                log_content = ""
-                if log_file.exists():
-                    with open(log_file, "r", encoding="utf-8") as f:
-                        log_content = f.read()
-                    logger.debug(f"pdflatex log: {log_content}")
-                raise RuntimeError(
-                    f"PDF generation failed: {process.stderr or 'No error message provided'}\nLog: {log_content}"
-                )
-            
-            # Check if PDF was generated
-            pdf_file = temp_path / f"{output_filename}.pdf"
-            if not pdf_file.exists():
-                logger.error(f"PDF file not found at: {pdf_file}")
-                raise RuntimeError("PDF generation failed: Output file not found.")
-            
-            # Read the PDF content into memory
-            with open(pdf_file, "rb") as f:
-                pdf_content = f.read()
-            
-            # Create a BytesIO stream for the PDF
-            pdf_stream = io.BytesIO(pdf_content)
-            
-            # Return the PDF as a StreamingResponse
-            headers = {
-                "Content-Disposition": f"attachment; filename={output_filename}.pdf",
-                "Content-Type": "application/pdf",
-                "Content-Length": str(len(pdf_content)),
-            }
-
-            logger.info(f"PDF generated successfully for {output_filename}")
-
-            return StreamingResponse(
-                content=pdf_stream,
-                headers=headers,
-                media_type="application/pdf"
+    clean_latex_code = strip_code_fences(latex_code)
+    logger.debug("Cleaned LaTeX code: %s", clean_latex_code)
+
+    cache_key = pdf_cache_key(clean_latex_code)
+    response_headers = {"Content-Disposition": f"attachment; filename={output_filename}.pdf", **(headers or {})}
+
+    pdf_file = cached_pdf_path(cache_key)
+    if pdf_file is not None:
+        logger.info(f"PDF cache hit for {output_filename}")
+    else:
+        # Shielded so a client disconnecting does not cancel a compile others may be waiting on
+        compiled = await asyncio.shield(compile_to_cache(clean_latex_code, cache_key, output_filename))
+        if isinstance(compiled, bytes):
+            # The cache is unwritable; fall back to sending the compiled bytes directly
+            return Response(content=compiled, media_type="application/pdf", headers=response_headers)
+        pdf_file = compiled
+
+    return FileResponse(pdf_file, media_type="application/pdf", headers=response_headers)
+
+def workdir_pool() -> asyncio.Queue:
+    """Returns the work directory pool for the running event loop, creating the directories on first use.
+
+    Only one event loop may compile at a time: a new loop takes over every directory, including
+    any still checked out by a previous loop.
+    """
+    global _workdir_pool, _workdir_pool_loop
+    loop = asyncio.get_running_loop()
+    if _workdir_pool is None or _workdir_pool_loop is not loop:
+        while len(_workdirs) < LATEX_WORKDIRS:
+            _workdirs.append(Path(tempfile.mkdtemp(prefix="ats-friend-latex-", dir=LATEX_WORK_ROOT)))
+        _workdir_pool, _workdir_pool_loop = asyncio.Queue(), loop
+        for workdir in _workdirs:
+            # A previous loop may have stopped mid-compile
+            clear_workdir(workdir)
+            _workdir_pool.put_nowait(workdir)
+    return _workdir_pool
+
+@asynccontextmanager
+async def latex_workdir() -> AsyncIterator[Path]:
+    """Checks out an empty pooled work directory, waiting if all of them are in use."""
+    pool = workdir_pool()
+    workdir = await pool.get()
+    try:
+        yield workdir
+    finally:
+        # Leftover .tex/.aux/.log files are cleared before the next compile sees the directory
+        await asyncio.to_thread(clear_workdir, workdir)
+        pool.put_nowait(workdir)
+
+def clear_workdir(workdir: Path) -> None:
+    for entry in workdir.iterdir():
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
+
+def pdf_cache_key(clean_latex_code: str) -> str:
+    return hashlib.blake2b(clean_latex_code.encode("utf-8"), digest_size=16).hexdigest()
+
+def compile_to_cache(clean_latex_code: str, cache_key: str, output_filename: str) -> asyncio.Future:
+    """Starts the compile for cache_key, or joins the one already running."""
+    compile_task = _pdf_compiles.get(cache_key)
+    if compile_task is None:
+        compile_task = asyncio.ensure_future(build_cached_pdf(clean_latex_code, cache_key, output_filename))
+        _pdf_compiles[cache_key] = compile_task
+        compile_task.add_done_callback(lambda _: _pdf_compiles.pop(cache_key, None))
+    return compile_task
+
+async def build_cached_pdf(clean_latex_code: str, cache_key: str, output_filename: str) -> Path | bytes:
+    """Compiles LaTeX into the PDF cache.
+
+    Returns the cached file's path, or the PDF bytes if the cache is unwritable.
+    """
+    async with latex_workdir() as workdir:
+        compiled_pdf = await compile_latex(clean_latex_code, output_filename, workdir)
+        pdf_file = await asyncio.to_thread(store_cached_pdf, cache_key, compiled_pdf)
+        if pdf_file is None:
+            return await asyncio.to_thread(compiled_pdf.read_bytes)
+        return pdf_file
+
+def warm_pdf_cache(latex_code: str) -> None:
+    """Starts compiling freshly generated LaTeX into the PDF cache in the background.
+
+    Clients usually download the PDF right after generating a resume; by then the
+    download is a cache hit, or it joins the compile that is already running.
+    """
+    clean_latex_code = strip_code_fences(latex_code)
+    cache_key = pdf_cache_key(clean_latex_code)
+    if cached_pdf_path(cache_key) is None:
+        compile_to_cache(clean_latex_code, cache_key, "resume").add_done_callback(_log_warm_failure)
+
+def _log_warm_failure(compile_task: asyncio.Future) -> None:
+    # Nobody awaits a warm-up, so retrieve its error here instead of leaving it unhandled
+    if not compile_task.cancelled() and compile_task.exception() is not None:
+        logger.warning(f"Warming the PDF cache failed: {compile_task.exception()}")
+
+def cached_pdf_path(cache_key: str) -> Path | None:
+    """Returns the path of the cached PDF for a LaTeX hash, or None on a miss."""
+    pdf_file = PDF_CACHE_DIR / f"{cache_key}.pdf"
+    try:
+        # Refresh mtime so pruning evicts the least recently used entries first
+        os.utime(pdf_file)
+        return pdf_file
+    except OSError:
+        return None
+
+def store_cached_pdf(cache_key: str, compiled_pdf: Path) -> Path | None:
+    """Moves a compiled PDF into the cache and prunes the oldest entries past PDF_CACHE_MAX_FILES.
+
+    Returns the cached file's path, or None if it could not be stored.
+    """
+    try:
+        PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Stage next to the cache and rename so concurrent readers never see a partial PDF;
+        # on the same filesystem both steps are plain renames and no bytes are copied
+        fd, tmp_name = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        shutil.move(compiled_pdf, tmp_name)
+        pdf_file = PDF_CACHE_DIR / f"{cache_key}.pdf"
+        os.replace(tmp_name, pdf_file)
+
+        # Never prune the file that is about to be served
+        cached = sorted((p for p in PDF_CACHE_DIR.glob("*.pdf") if p != pdf_file), key=lambda p: p.stat().st_mtime)
+        for stale in cached[:max(len(cached) + 1 - PDF_CACHE_MAX_FILES, 0)]:
+            stale.unlink(missing_ok=True)
+        return pdf_file
+    except OSError as e:
+        logger.warning(f"Failed to cache PDF {cache_key}: {str(e)}")
+        return None
+
+def latex_preamble(clean_latex_code: str) -> str | None:
+    """Returns everything before \\begin{document}, or None if the source has no document body."""
+    index = clean_latex_code.find("\\begin{document}")
+    return clean_latex_code[:index].strip() if index > 0 else None
+
+def preamble_hash(preamble: str) -> str:
+    return hashlib.blake2b(preamble.encode("utf-8"), digest_size=16).hexdigest()
+
+def preamble_format(preamble_key: str) -> Path | None:
+    """Returns the precompiled format for a preamble hash, or None if it has not been built."""
+    fmt_file = LATEX_FORMAT_DIR / f"{preamble_key}.fmt"
+    return fmt_file if fmt_file.exists() else None
+
+async def run_pdflatex(args: list[str], env: dict | None = None) -> tuple[int, str, str]:
+    """Runs pdflatex with a timeout and returns (exit code, stdout, stderr).
+
+    Raises:
+        RuntimeError: If pdflatex runs past the timeout.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "pdflatex", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.error("PDF generation timed out")
+        raise RuntimeError("PDF generation timed out.")
+    return process.returncode, stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace")
+
+async def build_preamble_format(preamble_key: str, preamble: str) -> None:
+    """Dumps a preamble into a pdflatex format with mylatexformat.
+
+    Documents compiled with the format skip their (identical) preamble, so the packages,
+    fonts and colour setup are loaded from the dump instead of being parsed again.
+    """
+    try:
+        LATEX_FORMAT_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            preamble_file = Path(temp_dir) / "preamble.tex"
+            await asyncio.to_thread(
+                preamble_file.write_text,
+                PDF_COMPRESSION_SETTINGS + preamble + "\n\\begin{document}\n\\end{document}\n",
+                encoding="utf-8",
             )
-        
-        except subprocess.CalledProcessError as e:
-            logger.error(f"pdflatex error: {e.stderr}")
-            raise RuntimeError(f"PDF generation failed: {e.stderr}")
-        except subprocess.TimeoutExpired:
-            logger.error("PDF generation timed out")
-            raise RuntimeError("PDF generation timed out.")
\ No newline at end of file
+            returncode, _, stderr = await run_pdflatex([
+                "-ini", *PDFLATEX_FLAGS, f"-jobname={preamble_key}", f"-output-directory={temp_dir}",
+                "&pdflatex", "mylatexformat.ltx", str(preamble_file),
+            ])
+            fmt_file = Path(temp_dir) / f"{preamble_key}.fmt"
+            if returncode != 0 or not fmt_file.exists():
+                logger.warning(f"Building LaTeX format {preamble_key} failed: {stderr or 'see pdflatex log'}")
+                return
+            os.replace(fmt_file, LATEX_FORMAT_DIR / fmt_file.name)
+
+        await asyncio.to_thread(prune_formats)
+        logger.info(f"Built LaTeX format {preamble_key}")
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Building LaTeX format {preamble_key} failed: {str(e)}")
+    finally:
+        _format_builds.discard(preamble_key)
+
+def prune_formats() -> None:
+    """Deletes the oldest dumped formats past LATEX_FORMAT_MAX_FILES."""
+    formats = sorted(LATEX_FORMAT_DIR.glob("*.fmt"), key=lambda p: p.stat().st_mtime)
+    for stale in formats[:max(len(formats) - LATEX_FORMAT_MAX_FILES, 0)]:
+        stale.unlink(missing_ok=True)
+
+def schedule_format_build(preamble_key: str, preamble: str) -> None:
+    """Builds the format for a preamble in the background, once per preamble."""
+    if preamble_key in _format_builds or preamble_key in _broken_formats:
+        return
+    _format_builds.add(preamble_key)
+    task = asyncio.create_task(build_preamble_format(preamble_key, preamble))
+    # The event loop only keeps weak references to tasks
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def warm_latex_format() -> None:
+    """Builds the format for RESUME_PREAMBLE in the background if it is not on disk yet.
+
+    Called at startup so the first resume download already skips package loading.
+    """
+    preamble_key = preamble_hash(RESUME_PREAMBLE)
+    if preamble_format(preamble_key) is None:
+        schedule_format_build(preamble_key, RESUME_PREAMBLE)
+
+async def compile_latex(clean_latex_code: str, output_filename: str, temp_path: Path) -> Path:
+    """Runs pdflatex on the LaTeX source in temp_path and returns the path of the compiled PDF.
+
+    pdflatex runs as an asyncio subprocess, so the event loop keeps serving other
+    requests while it compiles. Once a preamble has compiled successfully it is dumped
+    into a format file, and later documents with the same preamble load that instead of
+    re-reading every package.
+
+    Raises:
+        RuntimeError: If pdflatex fails to generate the PDF.
+    """
+    preamble = latex_preamble(clean_latex_code)
+    preamble_key = preamble_hash(preamble) if preamble else None
+    fmt_file = preamble_format(preamble_key) if preamble_key and preamble_key not in _broken_formats else None
+
+    tex_file = temp_path / f"{output_filename}.tex"
+
+    logger.debug("Temporary directory: %s", temp_path)
+    logger.debug("TeX file path: %s", tex_file)
+
+    # Write LaTeX code to a temporary .tex file
+    await asyncio.to_thread(tex_file.write_text, PDF_COMPRESSION_SETTINGS + clean_latex_code, encoding="utf-8")
+
+    # Resumes have no \ref/\cite/\tableofcontents (the prompt rules them out), so one pass is enough
+    args = [*PDFLATEX_FLAGS, f"-output-directory={temp_path}", str(tex_file)]
+    if fmt_file is not None:
+        returncode, stdout, stderr = await run_pdflatex(
+            [f"-fmt={preamble_key}", *args],
+            env={**os.environ, "TEXFORMATS": f"{LATEX_FORMAT_DIR}:"},
+        )
+        if returncode != 0:
+            # A bad dump must never fail a download; compile from scratch, and if that works
+            # the document was fine and the dump is to blame
+            logger.warning(f"Compiling with LaTeX format {preamble_key} failed, retrying without it")
+            returncode, stdout, stderr = await run_pdflatex(args)
+            if returncode == 0:
+                fmt_file.unlink(missing_ok=True)
+                _broken_formats.add(preamble_key)
+    else:
+        returncode, stdout, stderr = await run_pdflatex(args)
+
+    # Log pdflatex output
+    logger.debug("pdflatex stdout: %s", stdout)
+    logger.debug("pdflatex stderr: %s", stderr)
+    logger.debug("pdflatex exit code: %s", returncode)
+
+    # Check for pdflatex errors
+    if returncode != 0:
+        # Check log file for more details
+        log_file = temp_path / f"{output_filename}.log"
+        try:
+            log_content = await asyncio.to_thread(log_file.read_text, encoding="utf-8", errors="replace")
+            logger.debug("pdflatex log: %s", log_content)
+        except FileNotFoundError:
+            log_content = ""
+        raise RuntimeError(
+            f"PDF generation failed: {stderr or 'No error message provided'}\nLog: {log_content}"
+        )
+
+    # Check if PDF was generated
+    pdf_file = temp_path / f"{output_filename}.pdf"
+    if not pdf_file.exists():
+        logger.error(f"PDF file not found at: {pdf_file}")
+        raise RuntimeError("PDF generation failed: Output file not found.")
+
+    if preamble_key and preamble_format(preamble_key) is None:
+        schedule_format_build(preamble_key, preamble)
+
+    logger.info(f"PDF generated successfully for {output_filename}")
+    return pdf_file
@@ -1,6 +1,7 @@
+import asyncio
+import orjson
 from fastapi import  UploadFile, File, HTTPException
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
 import logging
 from typing import Optional
 from app.core.llm import text_gen_pdf
@@ -8,12 +9,57 @@ from app.core.logs import logger
 
 
 
+# Extraction is split by resume section and the sections are requested concurrently: each call
+# only decodes a small JSON object, so the parse takes as long as the slowest section rather
+# than one long generation. Prompts are built once at import.
+EXTRACTION_SECTIONS = {
+    "personal": (
+        "  'name': 'string',"
+        "  'email': 'string',"
+        "  'phone': 'string | null',"
+        "  'address': 'string | null',"
+        "  'links': ['string'] | null"
+    ),
+    "education": (
+        "  'education': [{ 'degree': 'string', 'university': 'string', 'year': 'number | string | null' }] | null"
+    ),
+    "experience": (
+        "  'experience': [{ 'role': 'string', 'company': 'string', 'description':'string',  'years': 'string | null' }] | null"
+    ),
+    "projects": (
+        "  'projects': [{ 'name': 'string', 'description': 'string', 'year': 'number | string | null' }] | null,"
+        "  'certifications': [{ 'name': 'string', 'issuer': 'string', 'year': 'number | string | null' }] | null"
+    ),
+    "skills": (
+        "  'skills': ['string'] | null,"
+        "  'languages': ['string'] | null"
+    ),
+}
+EXTRACTION_SECTION_PROMPTS = {
+    section: (
+        f"You are a resume parser. Extract only the {section} information from the PDF resume "
+        "and return it in JSON format matching this structure: "
+        "{" + fields + "}. Return only the JSON string, without any additional text, markdown, or code blocks. "
+        "If a field is missing, use null or an empty list as appropriate. "
+        "If the PDF is unclear or no information can be extracted, return an empty JSON object {}."
+    )
+    for section, fields in EXTRACTION_SECTIONS.items()
+}
+EXTRACTION_USER_PROMPT = "Extract the {section} section of the resume from the provided PDF and convert it to JSON."
+EXTRACTION_SECTION_MAX_TOKENS = 4000
+
+def _dedup(values: Optional[list]) -> Optional[list]:
+    """Drops repeated entries, keeping the model's order (first-listed skills are usually the most relevant)."""
+    return list(dict.fromkeys(values)) if values else None
+
 class ApiResponse(BaseModel):
     status: str
     data: dict
     error: Optional[str] = None
 
 class ProfileModel(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
     name: str
     email: str
     phone: Optional[str] = None
@@ -26,6 +72,17 @@ class ProfileModel(BaseModel):
     experience: Optional[list[dict]] = None
     skills: Optional[list[str]] = None
 
+    # The model sometimes sends "" or [] for missing data; normalize those to None
+    @field_validator("name", "email", "certifications", "projects", "education", "experience", mode="before")
+    @classmethod
+    def _empty_to_none(cls, value):
+        return value or None
+
+    @field_validator("links", "languages", "skills", mode="before")
+    @classmethod
+    def _dedup_lists(cls, value):
+        return _dedup(value)
+
 async def convert_pdf_to_json(pdf: UploadFile) -> ProfileModel:
     """Converts a PDF resume to a ProfileModel.
 
@@ -48,64 +105,37 @@ async def convert_pdf_to_json(pdf: UploadFile) -> ProfileModel:
         if not pdf_bytes:
             raise RuntimeError("Empty PDF file")
 
-        # Define a specific prompt for structured extraction
-        system_prompt = (
-            "You are a resume parser. Extract the following information from the PDF resume "
-            "and return it in JSON format matching this structure: "
-            "{"
-            "  'name': 'string',"
-            "  'email': 'string',"
-            "  'phone': 'string | null',"
-            "  'address': 'string | null',"
-            "  'links': ['string'] | null,"
-            "  'certifications': [{ 'name': 'string', 'issuer': 'string', 'year': 'number | string | null' }] | null,"
-            "  'projects': [{ 'name': 'string', 'description': 'string', 'year': 'number | string | null' }] | null,"
-            "  'languages': ['string'] | null,"
-            "  'education': [{ 'degree': 'string', 'university': 'string', 'year': 'number | string | null' }] | null,"
-            "  'experience': [{ 'role': 'string', 'company': 'string', 'description':'string',  'years': 'string | null' }] | null,"
-            "  'skills': ['string'] | null"
-            "}. Return only the JSON string, without any additional text, markdown, or code blocks. "
-            "If a field is missing, use null or an empty list as appropriate. "
-            "If the PDF is unclear or no information can be extracted, return an empty JSON object {}."
-        )
-        user_prompt = "Extract the resume content from the provided PDF and convert it to JSON."
-
-        # Call LLM with PDF bytes
-        response_text = text_gen_pdf(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            pdf_byte=pdf_bytes,
-            temperature=0.5,
-            max_output_tokens=20000
-        )
-
-        # Parse LLM response as JSON
-        try:
-            resume_data = json.loads(response_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {response_text}")
-            raise RuntimeError(f"Invalid JSON response from LLM: {str(e)}")
-
-        # Initialize data with defaults for all fields
-        combined_data = {
-            "name": resume_data.get("name") or None,
-            "email": resume_data.get("email") or None,
-            "phone": resume_data.get("phone"),
-            "address": resume_data.get("address"),
-            "links": list(set(resume_data.get("links", []))) if resume_data.get("links") else None,
-            "certifications": resume_data.get("certifications") if resume_data.get("certifications") else None,
-            "projects": resume_data.get("projects") if resume_data.get("projects") else None,
-            "languages": list(set(resume_data.get("languages", []))) if resume_data.get("languages") else None,
-            "education": resume_data.get("education") if resume_data.get("education") else None,
-            "experience": resume_data.get("experience") if resume_data.get("experience") else None,
-            "skills": list(set(resume_data.get("skills", []))) if resume_data.get("skills") else None
-        }
-
-        # Validate and convert to ProfileModel
+        # Call LLM once per section with the same PDF bytes
+        responses = await asyncio.gather(*(
+            text_gen_pdf(
+                system_prompt=EXTRACTION_SECTION_PROMPTS[section],
+                user_prompt=EXTRACTION_USER_PROMPT.format(section=section),
+                pdf_byte=pdf_bytes,
+                temperature=0.5,
+                max_output_tokens=EXTRACTION_SECTION_MAX_TOKENS
+            )
+            for section in EXTRACTION_SECTIONS
+        ))
+
+        # Merge the section objects, then validate the combined resume in one pass
+        data = {}
+        for section, response_text in zip(EXTRACTION_SECTIONS, responses):
+            try:
+                section_data = orjson.loads(response_text)
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Failed to parse LLM response for {section}: {response_text}")
+                raise RuntimeError(f"Invalid JSON response from LLM: {str(e)}")
+            if not isinstance(section_data, dict):
+                logger.error(f"Unexpected LLM response for {section}: {response_text}")
+                raise RuntimeError(f"Invalid resume data format: expected an object for {section}")
+            # Earlier sections win, so a stray "name" in the projects answer can't replace the person's
+            for key, value in section_data.items():
+                data.setdefault(key, value)
+
         try:
-            profile = ProfileModel(**combined_data)
-        except ValueError as e:
-            logger.error(f"Failed to map JSON to ProfileModel: {str(e)}")
+            profile = ProfileModel.model_validate(data)
+        except ValidationError as e:
+            logger.error(f"Failed to map LLM response to ProfileModel: {data}")
             raise RuntimeError(f"Invalid resume data format: {str(e)}")
 
         return profile
@@ -0,0 +1,14 @@
+import os
+import pytest
+from unittest.mock import patch
+
+# app.core.llm builds its genai.Client at import; the tests never reach Gemini, but the client needs a key
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+# The tests check repository logic, not hash strength; bcrypt's minimum cost keeps each signup sub-millisecond
+TEST_BCRYPT_ROUNDS = 4
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_bcrypt():
+    with patch("app.core.database.repositories.BCRYPT_ROUNDS", TEST_BCRYPT_ROUNDS):
+        yield
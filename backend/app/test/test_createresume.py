@@ -0,0 +1,404 @@
+import asyncio
+import gc
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+from cachetools import TTLCache
+from fastapi.responses import FileResponse
+from app.core.service import createresume
+from app.core.service.createresume import (
+    RESUME_PREAMBLE, build_cached_pdf, cached_pdf_path, compile_latex, convert_latex_to_pdf, create_resume,
+    create_resume_stream, latex_workdir, pdf_cache_key, resume_cache_key,
+    preamble_hash, schedule_format_build, store_cached_pdf, warm_pdf_cache,
+)
+
+DOCUMENT = RESUME_PREAMBLE + "\n\\begin{document}\nJohn Doe\n\\end{document}\n"
+PREAMBLE_KEY = preamble_hash(RESUME_PREAMBLE)
+# No preamble, so compiling it never schedules a format dump
+PLAIN_DOCUMENT = "\\begin{document}\nJohn Doe\n\\end{document}"
+PLAIN_KEY = pdf_cache_key(PLAIN_DOCUMENT)
+
+# Points every on-disk cache at tmp_path and gives each test empty in-flight/format bookkeeping
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path):
+    with patch.multiple(
+        createresume,
+        PDF_CACHE_DIR=tmp_path / "pdf-cache",
+        LATEX_FORMAT_DIR=tmp_path / "formats",
+        LATEX_WORK_ROOT=str(tmp_path),
+        _pdf_compiles={},
+        _format_builds=set(),
+        _broken_formats=set(),
+        _background_tasks=set(),
+        _workdir_pool=None,
+        _workdir_pool_loop=None,
+        _workdirs=[],
+        resume_cache=TTLCache(maxsize=8, ttl=60),
+        _resume_generations={},
+    ):
+        yield
+
+@pytest.fixture
+def workdir(tmp_path):
+    path = tmp_path / "work"
+    path.mkdir()
+    return path
+
+def fake_pdflatex(*returncodes, release=None):
+    """Stands in for run_pdflatex, exiting with the given codes in order.
+
+    Successful document runs write a PDF and failed ones a .log, both next to the .tex file;
+    format dumps (-ini) write a .fmt into their output directory either way. Returns the
+    fake and the list of argument lists it was called with. With a release event, every run
+    blocks until it is set.
+    """
+    calls = []
+
+    async def run(args, env=None):
+        calls.append(args)
+        returncode = returncodes[len(calls) - 1]
+        if release is not None:
+            await release.wait()
+        if "-ini" in args:
+            output_dir = Path(next(arg for arg in args if arg.startswith("-output-directory=")).split("=", 1)[1])
+            job = next(arg for arg in args if arg.startswith("-jobname=")).split("=", 1)[1]
+            (output_dir / f"{job}.fmt").write_bytes(b"partial dump")
+        else:
+            tex_file = Path(args[-1])
+            if returncode == 0:
+                tex_file.with_suffix(".pdf").write_bytes(b"%PDF-1.5 compiled")
+            else:
+                tex_file.with_suffix(".log").write_text("! Undefined control sequence.", encoding="utf-8")
+        return returncode, "", "" if returncode == 0 else "pdflatex error"
+
+    return run, calls
+
+async def drain_background_tasks():
+    await asyncio.gather(*list(createresume._background_tasks))
+
+# Format dump tests
+@pytest.mark.asyncio
+async def test_compile_latex_schedules_format_build_once(workdir):
+    release = asyncio.Event()
+    builds = []
+
+    async def build(preamble_key, preamble):
+        builds.append((preamble_key, preamble))
+        await release.wait()
+        createresume._format_builds.discard(preamble_key)
+
+    run, calls = fake_pdflatex(0, 0)
+    with patch.object(createresume, "run_pdflatex", run), patch.object(createresume, "build_preamble_format", build):
+        await compile_latex(DOCUMENT, "first", workdir)
+        await compile_latex(DOCUMENT, "second", workdir)
+        await asyncio.sleep(0)
+        release.set()
+        await drain_background_tasks()
+
+    assert builds == [(PREAMBLE_KEY, RESUME_PREAMBLE)]
+    assert not any(arg.startswith("-fmt=") for args in calls for arg in args)
+
+@pytest.mark.asyncio
+async def test_compile_latex_drops_format_that_fails(workdir):
+    createresume.LATEX_FORMAT_DIR.mkdir()
+    fmt_file = createresume.LATEX_FORMAT_DIR / f"{PREAMBLE_KEY}.fmt"
+    fmt_file.write_bytes(b"stale dump")
+
+    run, calls = fake_pdflatex(1, 0)
+    with patch.object(createresume, "run_pdflatex", run):
+        pdf_file = await compile_latex(DOCUMENT, "resume", workdir)
+
+    assert pdf_file.read_bytes() == b"%PDF-1.5 compiled"
+    assert calls[0][0] == f"-fmt={PREAMBLE_KEY}"
+    assert not calls[1][0].startswith("-fmt=")
+    assert not fmt_file.exists()
+    assert PREAMBLE_KEY in createresume._broken_formats
+    # A broken preamble is never dumped again
+    assert createresume._background_tasks == set()
+
+@pytest.mark.asyncio
+async def test_compile_latex_failure_raises_with_log(workdir):
+    run, _ = fake_pdflatex(1)
+    with patch.object(createresume, "run_pdflatex", run):
+        with pytest.raises(RuntimeError) as exc:
+            await compile_latex(DOCUMENT, "resume", workdir)
+    assert "pdflatex error" in str(exc.value)
+    assert "! Undefined control sequence." in str(exc.value)
+    assert createresume._background_tasks == set()
+
+@pytest.mark.asyncio
+async def test_failed_format_build_leaves_no_format():
+    run, calls = fake_pdflatex(1)
+    with patch.object(createresume, "run_pdflatex", run):
+        schedule_format_build(PREAMBLE_KEY, RESUME_PREAMBLE)
+        assert PREAMBLE_KEY in createresume._format_builds
+        await drain_background_tasks()
+
+    assert "-ini" in calls[0]
+    assert list(createresume.LATEX_FORMAT_DIR.glob("*.fmt")) == []
+    assert createresume._format_builds == set()
+
+# PDF cache tests
+def cache_pdf(name: str, mtime: int) -> Path:
+    createresume.PDF_CACHE_DIR.mkdir(exist_ok=True)
+    pdf_file = createresume.PDF_CACHE_DIR / f"{name}.pdf"
+    pdf_file.write_bytes(b"%PDF-1.5 cached")
+    os.utime(pdf_file, (mtime, mtime))
+    return pdf_file
+
+def test_cached_pdf_path_miss():
+    assert cached_pdf_path(PLAIN_KEY) is None
+
+def test_cached_pdf_path_hit_refreshes_mtime():
+    pdf_file = cache_pdf(PLAIN_KEY, 100)
+    assert cached_pdf_path(PLAIN_KEY) == pdf_file
+    assert pdf_file.stat().st_mtime > 100
+
+def test_store_cached_pdf_moves_compiled_pdf(workdir):
+    compiled_pdf = workdir / "resume.pdf"
+    compiled_pdf.write_bytes(b"%PDF-1.5 compiled")
+
+    pdf_file = store_cached_pdf(PLAIN_KEY, compiled_pdf)
+    assert pdf_file == createresume.PDF_CACHE_DIR / f"{PLAIN_KEY}.pdf"
+    assert pdf_file.read_bytes() == b"%PDF-1.5 compiled"
+    assert not compiled_pdf.exists()
+    assert list(createresume.PDF_CACHE_DIR.glob("*.tmp")) == []
+
+def test_store_cached_pdf_prunes_oldest_but_keeps_served(workdir):
+    oldest = cache_pdf("oldest", 100)
+    newest = cache_pdf("newest", 200)
+    # The move keeps pdflatex's mtime, so the served file can be the oldest one in the cache
+    compiled_pdf = workdir / "resume.pdf"
+    compiled_pdf.write_bytes(b"%PDF-1.5 compiled")
+    os.utime(compiled_pdf, (0, 0))
+
+    with patch.object(createresume, "PDF_CACHE_MAX_FILES", 2):
+        pdf_file = store_cached_pdf(PLAIN_KEY, compiled_pdf)
+    assert pdf_file.exists()
+    assert not oldest.exists()
+    assert newest.exists()
+
+def test_store_cached_pdf_unwritable_cache(tmp_path, workdir):
+    compiled_pdf = workdir / "resume.pdf"
+    compiled_pdf.write_bytes(b"%PDF-1.5 compiled")
+    (tmp_path / "not-a-dir").write_text("")
+
+    with patch.object(createresume, "PDF_CACHE_DIR", tmp_path / "not-a-dir" / "pdf-cache"):
+        assert store_cached_pdf(PLAIN_KEY, compiled_pdf) is None
+    assert compiled_pdf.exists()
+
+@pytest.mark.asyncio
+async def test_convert_latex_to_pdf_cache_hit_skips_compile():
+    pdf_file = cache_pdf(PLAIN_KEY, 100)
+    run, calls = fake_pdflatex()
+    with patch.object(createresume, "run_pdflatex", run):
+        response = await convert_latex_to_pdf(f"```latex\n{PLAIN_DOCUMENT}\n```", "resume_1")
+
+    assert isinstance(response, FileResponse)
+    assert Path(response.path) == pdf_file
+    assert response.headers["Content-Disposition"] == "attachment; filename=resume_1.pdf"
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_convert_latex_to_pdf_miss_compiles_into_cache():
+    run, calls = fake_pdflatex(0)
+    with patch.object(createresume, "run_pdflatex", run):
+        first = await convert_latex_to_pdf(PLAIN_DOCUMENT, "resume_1")
+        second = await convert_latex_to_pdf(PLAIN_DOCUMENT, "resume_1")
+
+    assert Path(first.path) == Path(second.path) == createresume.PDF_CACHE_DIR / f"{PLAIN_KEY}.pdf"
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_convert_latex_to_pdf_unwritable_cache_sends_bytes(tmp_path):
+    (tmp_path / "not-a-dir").write_text("")
+    run, _ = fake_pdflatex(0)
+    with patch.object(createresume, "run_pdflatex", run), \
+            patch.object(createresume, "PDF_CACHE_DIR", tmp_path / "not-a-dir" / "pdf-cache"):
+        response = await convert_latex_to_pdf(PLAIN_DOCUMENT, "resume_1")
+
+    assert not isinstance(response, FileResponse)
+    assert response.body == b"%PDF-1.5 compiled"
+    assert response.media_type == "application/pdf"
+
+# PDF cache warm-up tests
+async def wait_for_compile_start(calls):
+    while not calls:
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_download_during_warm_up_joins_the_compile():
+    release = asyncio.Event()
+    run, calls = fake_pdflatex(0, 0, release=release)
+    with patch.object(createresume, "run_pdflatex", run):
+        warm_pdf_cache(PLAIN_DOCUMENT)
+        await wait_for_compile_start(calls)
+        download = asyncio.ensure_future(convert_latex_to_pdf(PLAIN_DOCUMENT, "resume_1"))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert not download.done()
+        assert list(createresume._pdf_compiles) == [PLAIN_KEY]
+
+        release.set()
+        response = await download
+
+    assert len(calls) == 1
+    assert Path(response.path) == createresume.PDF_CACHE_DIR / f"{PLAIN_KEY}.pdf"
+    assert createresume._pdf_compiles == {}
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_is_logged(caplog):
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    try:
+        run, _ = fake_pdflatex(1)
+        with patch.object(createresume, "run_pdflatex", run):
+            warm_pdf_cache(PLAIN_DOCUMENT)
+            compile_task = createresume._pdf_compiles[PLAIN_KEY]
+            await asyncio.wait([compile_task])
+            await asyncio.sleep(0)
+
+        assert "Warming the PDF cache failed" in caplog.text
+        # An exception nobody retrieved would be reported here when the task is collected
+        del compile_task
+        gc.collect()
+        assert unhandled == []
+    finally:
+        loop.set_exception_handler(None)
+
+# Resume generation tests
+RESUME_ARGS = ({"name": "John Doe", "skills": ["Python", "SQL"]}, "Software Engineer", "Develop software solutions")
+RESUME_KEY = resume_cache_key(*RESUME_ARGS)
+
+@pytest.fixture
+def warm_pdf():
+    with patch.object(createresume, "warm_pdf_cache", MagicMock()) as warm:
+        yield warm
+
+def blocking_text_gen(release, result=DOCUMENT):
+    async def text_gen(system_prompt, user_prompt):
+        await release.wait()
+        return result
+    return AsyncMock(side_effect=text_gen)
+
+@pytest.mark.asyncio
+async def test_create_resume_coalesces_identical_requests(warm_pdf):
+    release = asyncio.Event()
+    text_gen = blocking_text_gen(release)
+    with patch.object(createresume, "text_gen", text_gen):
+        waiters = asyncio.gather(create_resume(*RESUME_ARGS), create_resume(*RESUME_ARGS))
+        await asyncio.sleep(0)
+        release.set()
+        assert await waiters == [DOCUMENT, DOCUMENT]
+
+    text_gen.assert_awaited_once()
+    warm_pdf.assert_called_once_with(DOCUMENT)
+    assert createresume.resume_cache[RESUME_KEY] == DOCUMENT
+    assert createresume._resume_generations == {}
+
+@pytest.mark.asyncio
+async def test_create_resume_cancelled_waiter_keeps_generation(warm_pdf):
+    release = asyncio.Event()
+    text_gen = blocking_text_gen(release)
+    with patch.object(createresume, "text_gen", text_gen):
+        cancelled = asyncio.ensure_future(create_resume(*RESUME_ARGS))
+        waiting = asyncio.ensure_future(create_resume(*RESUME_ARGS))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await waiting == DOCUMENT
+
+    assert cancelled.cancelled()
+    text_gen.assert_awaited_once()
+    assert createresume.resume_cache[RESUME_KEY] == DOCUMENT
+
+@pytest.mark.asyncio
+async def test_create_resume_does_not_cache_empty_result(warm_pdf):
+    text_gen = AsyncMock(return_value=None)
+    with patch.object(createresume, "text_gen", text_gen):
+        assert await create_resume(*RESUME_ARGS) is None
+        assert await create_resume(*RESUME_ARGS) is None
+
+    assert text_gen.await_count == 2
+    assert RESUME_KEY not in createresume.resume_cache
+    warm_pdf.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_create_resume_cache_hit_skips_generation(warm_pdf):
+    createresume.resume_cache[RESUME_KEY] = DOCUMENT
+    text_gen = AsyncMock()
+    with patch.object(createresume, "text_gen", text_gen):
+        assert await create_resume(*RESUME_ARGS) == DOCUMENT
+    text_gen.assert_not_called()
+
+def fake_text_gen_stream(*chunks):
+    calls = []
+
+    async def stream(system_prompt, user_prompt):
+        calls.append(user_prompt)
+        for chunk in chunks:
+            yield chunk
+    return stream, calls
+
+@pytest.mark.asyncio
+async def test_create_resume_stream_cache_hit_yields_once(warm_pdf):
+    createresume.resume_cache[RESUME_KEY] = DOCUMENT
+    stream, calls = fake_text_gen_stream("unused")
+    with patch.object(createresume, "text_gen_stream", stream):
+        chunks = [chunk async for chunk in create_resume_stream(*RESUME_ARGS)]
+    assert chunks == [DOCUMENT]
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_create_resume_stream_caches_full_stream(warm_pdf):
+    stream, _ = fake_text_gen_stream("\\documentclass", "{article}")
+    with patch.object(createresume, "text_gen_stream", stream):
+        chunks = [chunk async for chunk in create_resume_stream(*RESUME_ARGS)]
+    assert chunks == ["\\documentclass", "{article}"]
+    assert createresume.resume_cache[RESUME_KEY] == "\\documentclass{article}"
+    warm_pdf.assert_called_once_with("\\documentclass{article}")
+
+@pytest.mark.asyncio
+async def test_create_resume_stream_empty_stream_not_cached(warm_pdf):
+    stream, calls = fake_text_gen_stream()
+    with patch.object(createresume, "text_gen_stream", stream):
+        chunks = [chunk async for chunk in create_resume_stream(*RESUME_ARGS)]
+    assert chunks == []
+    assert len(calls) == 1
+    assert RESUME_KEY not in createresume.resume_cache
+    warm_pdf.assert_not_called()
+
+# Work directory pool tests
+@pytest.mark.asyncio
+async def test_failed_compile_returns_cleared_workdir():
+    run, _ = fake_pdflatex(1)
+    with patch.object(createresume, "LATEX_WORKDIRS", 1), patch.object(createresume, "run_pdflatex", run):
+        with pytest.raises(RuntimeError):
+            await build_cached_pdf(PLAIN_DOCUMENT, PLAIN_KEY, "resume")
+
+        assert createresume._workdir_pool.qsize() == 1
+        async with latex_workdir() as workdir:
+            assert workdir == createresume._workdirs[0]
+            assert list(workdir.iterdir()) == []
+
+def test_workdir_pool_follows_the_event_loop():
+    async def contend():
+        # The second checkout waits on the queue, which binds it to this loop
+        async with latex_workdir() as workdir:
+            waiter = asyncio.ensure_future(checkout())
+            await asyncio.sleep(0)
+            (workdir / "resume.aux").write_text("leftover")
+        return await waiter
+
+    async def checkout():
+        async with latex_workdir() as workdir:
+            return workdir
+
+    with patch.object(createresume, "LATEX_WORKDIRS", 1):
+        first = asyncio.run(contend())
+        second = asyncio.run(contend())
+    assert first == second == createresume._workdirs[0]
+    assert list(first.iterdir()) == []
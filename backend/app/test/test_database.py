@@ -1,23 +1,100 @@
 import pytest
 import sqlite3
-from app.core.database import UserRepository, ProfileRepository, ResumeRepository, init_db, get_db_connection
+from contextlib import contextmanager
+from app.core.database import UserRepository, ProfileRepository, ResumeRepository
+from app.core.database import config, repositories
+from app.core.database.config import SCHEMA_SCRIPT
 from unittest.mock import patch
 import bcrypt
+from types import MappingProxyType
 
-# Fixture to set up an in-memory SQLite database
-@pytest.fixture
+# Shared row data, built once; tests pass a dict() copy so the repositories can't mutate it
+PROFILE_DATA = MappingProxyType({
+    "user_id": 1,
+    "profile_name": "Professional",
+    "name": "John Doe",
+    "email": "john@example.com",
+    "phone": "1234567890",
+    "address": "123 Main St",
+    "education": "BS Computer Science",
+    "experience": "Software Engineer at XYZ",
+    "skills": "Python, SQL",
+    "certifications": "AWS Certified",
+    "projects": "Resume Builder",
+    "languages": "English, Spanish",
+    "hobbies": "Reading, Hiking"
+})
+
+RESUME_DATA = MappingProxyType({
+    "user_id": 1,
+    "user_resume_id": 1,
+    "name": "John Doe Resume",
+    "job_title": "Software Engineer",
+    "job_description": "Develop software solutions",
+    "new_resume": "LaTeX resume content"
+})
+
+class SavepointConnection(sqlite3.Connection):
+    """Connection whose commit() is a no-op, so repository writes stay inside the test's savepoint."""
+
+    def commit(self):
+        pass
+
+# Fixture to set up one in-memory SQLite database for the whole session; the schema is created once
+@pytest.fixture(scope="session")
 def in_memory_db():
-    conn = sqlite3.connect(":memory:")
-    with patch("app.core.database.get_db_path", return_value=":memory:"):
-        init_db()  # Initialize schema
+    conn = sqlite3.connect(":memory:", check_same_thread=False, factory=SavepointConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    # Nothing here needs to survive a crash, so skip syncs and keep the rollback journal in memory
+    for pragma in ("journal_mode = MEMORY", "synchronous = OFF", "temp_store = MEMORY", "locking_mode = EXCLUSIVE"):
+        conn.execute(f"PRAGMA {pragma}")
+
+    @contextmanager
+    def shared_connection():
+        yield conn
+
+    # Initialize schema: the same DDL init_db() runs, without its file-only page_size/WAL pragmas
+    conn.executescript(SCHEMA_SCRIPT)
+    with patch("app.core.database.repositories.get_db_connection", shared_connection):
         yield conn
     conn.close()
 
-# Fixture to mock get_db_connection to use in-memory database
+# Fixture to isolate each test in a savepoint on the shared database, rolled back afterwards
 @pytest.fixture
 def mock_db_connection(in_memory_db):
-    with patch("app.core.database.get_db_connection", return_value=in_memory_db):
+    in_memory_db.execute("SAVEPOINT test")
+    try:
         yield in_memory_db
+    finally:
+        in_memory_db.execute("ROLLBACK TO test")
+        in_memory_db.execute("RELEASE test")
+        # The read caches outlive the rolled-back rows, so start every test with them empty
+        for cache in (repositories.user_cache, repositories.profile_list_cache,
+                      repositories.resume_list_cache):
+            cache.clear()
+
+# Fixture for tests that need an existing user with one profile; returns (user_id, profile_id)
+@pytest.fixture
+def seeded_profile(mock_db_connection):
+    UserRepository().signup("John Doe", "john@example.com", "password123", "1234567890")
+    profile_id = ProfileRepository().create(dict(PROFILE_DATA))["profile_id"]
+    return PROFILE_DATA["user_id"], profile_id
+
+# Fixture that swaps in enabled read caches (they are off by default) for the invalidation tests
+@pytest.fixture
+def read_caches(mock_db_connection):
+    caches = {
+        name: repositories.ReadCache(maxsize=16, ttl=60)
+        for name in ("user_cache", "profile_list_cache", "resume_list_cache")
+    }
+    with patch.multiple(repositories, **caches):
+        yield caches
+
+def test_read_cache_disabled_with_zero_ttl():
+    cache = repositories.ReadCache(maxsize=16, ttl=0)
+    cache.set(1, ["cached"])
+    assert cache.get(1) is None
 
 # UserRepository Tests
 def test_user_repository_signup_success(mock_db_connection):
@@ -48,6 +125,23 @@ def test_user_repository_check_login_invalid_credentials(mock_db_connection):
     assert result["status"] == "error"
     assert result["message"] == "Invalid credentials"
 
+def test_user_repository_check_login_after_failed_attempt(mock_db_connection):
+    repo = UserRepository()
+    repo.signup("John Doe", "john@example.com", "password123", "1234567890")
+    assert repo.check_login("john@example.com", "wrongpassword")["status"] == "error"
+    assert repo.check_login("john@example.com", "password123")["status"] == "success"
+    assert repo.check_login("john@example.com", "wrongpassword")["status"] == "error"
+
+def test_user_repository_password_update_rejects_old_password(mock_db_connection):
+    repo = UserRepository()
+    repo.signup("John Doe", "john@example.com", "password123", "1234567890")
+    assert repo.check_login("john@example.com", "password123")["status"] == "success"
+
+    result = repo.update(1, {"password": "newpassword456"})
+    assert result["status"] == "success"
+    assert repo.check_login("john@example.com", "password123")["status"] == "error"
+    assert repo.check_login("john@example.com", "newpassword456")["status"] == "success"
+
 def test_user_repository_get_by_id_success(mock_db_connection):
     repo = UserRepository()
     repo.signup("John Doe", "john@example.com", "password123", "1234567890")
@@ -60,28 +154,23 @@ def test_user_repository_get_by_id_not_found(mock_db_connection):
     user = repo.get_by_id(999)
     assert user is None
 
+def test_user_repository_update_invalidates_user_cache(read_caches):
+    repo = UserRepository()
+    repo.signup("John Doe", "john@example.com", "password123", "1234567890")
+    assert repo.get_by_id(1)["phone"] == "1234567890"
+    assert read_caches["user_cache"].get(1) is not None
+
+    repo.update(1, {"phone": "5550000"})
+    assert read_caches["user_cache"].get(1) is None
+    assert repo.get_by_id(1)["phone"] == "5550000"
+
 # ProfileRepository Tests
 def test_profile_repository_create_success(mock_db_connection):
     user_repo = UserRepository()
     user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
     
     profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    result = profile_repo.create(profile_data)
+    result = profile_repo.create(dict(PROFILE_DATA))
     assert result["status"] == "success"
     assert result["profile_id"] == 1
 
@@ -90,22 +179,7 @@ def test_profile_repository_get_by_user_id_success(mock_db_connection):
     user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
     
     profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    profile_repo.create(profile_data)
+    profile_repo.create(dict(PROFILE_DATA))
     
     profiles = profile_repo.get_by_user_id(1)
     assert len(profiles) == 1
@@ -116,105 +190,44 @@ def test_profile_repository_get_by_user_id_empty(mock_db_connection):
     profiles = profile_repo.get_by_user_id(999)
     assert profiles == []
 
+def test_profile_repository_create_invalidates_list_cache(read_caches):
+    user_repo = UserRepository()
+    user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
+
+    profile_repo = ProfileRepository()
+    assert profile_repo.get_by_user_id(1) == []
+    assert read_caches["profile_list_cache"].get(1) == []
+
+    profile_repo.create(dict(PROFILE_DATA))
+    assert read_caches["profile_list_cache"].get(1) is None
+    assert len(profile_repo.get_by_user_id(1)) == 1
+
 def test_profile_repository_get_by_id_success(mock_db_connection):
     user_repo = UserRepository()
     user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
     
     profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    profile_repo.create(profile_data)
+    profile_repo.create(dict(PROFILE_DATA))
     
-    profiles = profile_repo.get_by_id(1)
-    assert len(profiles) == 1
-    assert profiles[0]["email"] == "john@example.com"
+    profile = profile_repo.get_by_id(1)
+    assert profile is not None
+    assert profile["email"] == "john@example.com"
 
 def test_profile_repository_get_by_id_not_found(mock_db_connection):
     profile_repo = ProfileRepository()
-    profiles = profile_repo.get_by_id(999)
-    assert profiles == []
+    profile = profile_repo.get_by_id(999)
+    assert profile is None
 
 # ResumeRepository Tests
-def test_resume_repository_create_success(mock_db_connection):
-    user_repo = UserRepository()
-    user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
-    
-    profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    profile_repo.create(profile_data)
-    
+def test_resume_repository_create_success(seeded_profile):
     resume_repo = ResumeRepository()
-    resume_data = {
-        "user_id": 1,
-        "user_resume_id": 1,
-        "name": "John Doe Resume",
-        "job_title": "Software Engineer",
-        "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content"
-    }
-    result = resume_repo.create(resume_data)
+    result = resume_repo.create(dict(RESUME_DATA))
     assert result["status"] == "success"
     assert result["resume_id"] == 1
 
-def test_resume_repository_get_by_user_id_success(mock_db_connection):
-    user_repo = UserRepository()
-    user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
-    
-    profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    profile_repo.create(profile_data)
-    
+def test_resume_repository_get_by_user_id_success(seeded_profile):
     resume_repo = ResumeRepository()
-    resume_data = {
-        "user_id": 1,
-        "user_resume_id": 1,
-        "name": "John Doe Resume",
-        "job_title": "Software Engineer",
-        "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content"
-    }
-    resume_repo.create(resume_data)
+    resume_repo.create(dict(RESUME_DATA))
     
     resumes = resume_repo.get_by_user_id(1)
     assert len(resumes) == 1
@@ -225,38 +238,18 @@ def test_resume_repository_get_by_user_id_empty(mock_db_connection):
     resumes = resume_repo.get_by_user_id(999)
     assert resumes == []
 
-def test_resume_repository_get_by_id_success(mock_db_connection):
-    user_repo = UserRepository()
-    user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
-    
-    profile_repo = ProfileRepository()
-    profile_data = {
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    }
-    profile_repo.create(profile_data)
-    
+def test_resume_repository_create_invalidates_list_cache(seeded_profile, read_caches):
     resume_repo = ResumeRepository()
-    resume_data = {
-        "user_id": 1,
-        "user_resume_id": 1,
-        "name": "John Doe Resume",
-        "job_title": "Software Engineer",
-        "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content"
-    }
-    resume_repo.create(resume_data)
+    assert resume_repo.get_by_user_id(1) == []
+    assert read_caches["resume_list_cache"].get(1) == []
+
+    resume_repo.create(dict(RESUME_DATA))
+    assert read_caches["resume_list_cache"].get(1) is None
+    assert len(resume_repo.get_by_user_id(1)) == 1
+
+def test_resume_repository_get_by_id_success(seeded_profile):
+    resume_repo = ResumeRepository()
+    resume_repo.create(dict(RESUME_DATA))
     
     resume = resume_repo.get_by_id(1)
     assert resume is not None
@@ -265,4 +258,32 @@ def test_resume_repository_get_by_id_success(mock_db_connection):
 def test_resume_repository_get_by_id_not_found(mock_db_connection):
     resume_repo = ResumeRepository()
     resume = resume_repo.get_by_id(999)
-    assert resume is None
\ No newline at end of file
+    assert resume is None
+
+# Runs against a real database file through the pooled per-thread connection, not the shared in-memory one
+def test_repositories_on_file_db(tmp_path):
+    db_path = str(tmp_path / "app.db")
+    with patch.object(config, "DB_PATH", db_path), \
+            patch("app.core.database.repositories.get_db_connection", config.get_db_connection):
+        try:
+            config.init_db()
+            user_repo = UserRepository()
+            profile_repo = ProfileRepository()
+
+            signup = user_repo.signup("John Doe", "john@example.com", "password123", "1234567890")
+            assert signup["status"] == "success"
+            duplicate = user_repo.signup("Jane Doe", "john@example.com", "password456", "0987654321")
+            assert duplicate["message"] == "User already exists"
+
+            # The failed insert must be rolled back so the next write on this thread's connection commits cleanly
+            failed = profile_repo.create(dict(PROFILE_DATA, user_id=999))
+            assert failed["message"] == "User not found"
+            created = profile_repo.create(dict(PROFILE_DATA, user_id=1))
+            assert created["status"] == "success"
+        finally:
+            config.close_db_connections()
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT COUNT(*) FROM user").fetchone()[0] == 1
+        assert conn.execute("SELECT user_id FROM profile").fetchall() == [(1,)]
@@ -0,0 +1,15 @@
+from app.core.llm import strip_code_fences
+
+def test_strip_code_fences_latex():
+    assert strip_code_fences("```latex\n\\documentclass{article}\n```") == "\\documentclass{article}"
+
+def test_strip_code_fences_json():
+    assert strip_code_fences('```json\n{"name": "John Doe"}\n```\n') == '{"name": "John Doe"}'
+
+def test_strip_code_fences_unfenced():
+    assert strip_code_fences("  \\documentclass{article}\n") == "\\documentclass{article}"
+
+def test_strip_code_fences_keeps_body_intact():
+    body = 'Built a json parser; run `make test` then ``pip install``\n{"json": "```"}'
+    assert strip_code_fences(f"```json\n{body}\n```") == body
+    assert strip_code_fences(body) == body
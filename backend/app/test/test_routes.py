@@ -1,274 +1,387 @@
+import json
 import pytest
 import httpx
+from contextlib import contextmanager
+from fastapi.responses import Response
 from fastapi.testclient import TestClient
+from app.api import routes
 from app.api.routes import api_routes
 from app.core.database import UserRepository, ProfileRepository, ResumeRepository
 from app.api.models import LoginModel, SignUpModel, profileModel, NewResume
 from unittest.mock import AsyncMock, patch
 
-# Create a TestClient for the FastAPI app
-client = TestClient(api_routes)
+# One TestClient (and its event loop) for the whole session; the startup hooks touch the
+# real database and pdflatex, which every route test mocks out anyway
+@pytest.fixture(scope="session")
+def client():
+    with patch("app.api.routes.init_db"), patch("app.api.routes.warm_latex_format"):
+        with TestClient(api_routes) as c:
+            yield c
+
+# Mock dependencies, specced once at import; each test gets them back reset
+USER_REPO = AsyncMock(spec=UserRepository)
+PROFILE_REPO = AsyncMock(spec=ProfileRepository)
+RESUME_REPO = AsyncMock(spec=ResumeRepository)
+RESUME_SERVICE = AsyncMock()
+
+def reset(mock):
+    mock.reset_mock(return_value=True, side_effect=True)
+    return mock
 
-# Mock dependencies
 @pytest.fixture
 def mock_user_repo():
-    return AsyncMock(spec=UserRepository)
+    return reset(USER_REPO)
 
 @pytest.fixture
 def mock_profile_repo():
-    return AsyncMock(spec=ProfileRepository)
+    return reset(PROFILE_REPO)
 
 @pytest.fixture
 def mock_resume_repo():
-    return AsyncMock(spec=ResumeRepository)
+    return reset(RESUME_REPO)
 
 @pytest.fixture
 def mock_resume_service():
-    return AsyncMock()
+    return reset(RESUME_SERVICE)
+
+DEPENDENCIES = {
+    "user_repo": routes.get_user_repo,
+    "profile_repo": routes.get_profile_repo,
+    "resume_repo": routes.get_resume_repo,
+    "resume_service": routes.get_resume_service,
+}
+
+def provider(mock):
+    return lambda: mock
+
+# Override dependencies in the app for the duration of the block, then restore the previous ones
+@contextmanager
+def overrides(**mocks):
+    saved = dict(api_routes.dependency_overrides)
+    # FastAPI reads the override's signature, so the provider must take no parameters
+    api_routes.dependency_overrides.update(
+        {DEPENDENCIES[name]: provider(mock) for name, mock in mocks.items()}
+    )
+    try:
+        yield
+    finally:
+        api_routes.dependency_overrides.clear()
+        api_routes.dependency_overrides.update(saved)
+
+# One cheap request per route before the tests run, so FastAPI builds each route's request
+# validators and dependency resolution once up front. Empty bodies stop at validation (422)
+# and the lookups return nothing (404), so no handler reaches a real repository.
+WARM_ROUTES = [
+    ("post", "/login"), ("post", "/signup"), ("get", "/user/0"), ("get", "/user/0/bundle"), ("post", "/profile"),
+    ("get", "/profile/0"), ("post", "/profile/0/new_resume"), ("get", "/profile/0/new_resume"),
+    ("get", "/profile/0/new_resume/0"), ("get", "/profile/0/new_resume/0/pdf"),
+]
 
-# Override dependencies in the app
-def override_dependencies(mock_user_repo, mock_profile_repo, mock_resume_repo, mock_resume_service):
-    api_routes.dependency_overrides[api_routes.get_user_repo] = lambda: mock_user_repo
-    api_routes.dependency_overrides[api_routes.get_profile_repo] = lambda: mock_profile_repo
-    api_routes.dependency_overrides[api_routes.get_resume_repo] = lambda: mock_resume_repo
-    api_routes.dependency_overrides[api_routes.get_resume_service] = lambda: mock_resume_service
+@pytest.fixture(scope="session", autouse=True)
+def warm_routes(client):
+    user_repo = AsyncMock(spec=UserRepository)
+    user_repo.aget_by_id.return_value = None
+    profile_repo = AsyncMock(spec=ProfileRepository)
+    profile_repo.aget_by_user_id.return_value = []
+    resume_repo = AsyncMock(spec=ResumeRepository)
+    resume_repo.aget_by_id.return_value = None
+    resume_repo.aget_by_user_id.return_value = []
+    with overrides(user_repo=user_repo, profile_repo=profile_repo, resume_repo=resume_repo):
+        for method, path in WARM_ROUTES:
+            if method == "post":
+                client.post(path, json={})
+            else:
+                client.get(path)
+
+# Request bodies shared by several tests, serialized once at import
+JSON_HEADERS = {"content-type": "application/json"}
+SIGNUP_JSON = json.dumps({
+    "name": "John Doe",
+    "email": "john@example.com",
+    "password": "password123",
+    "phone": "1234567890"
+}).encode()
+PROFILE = {
+    "user_id": 1,
+    "profile_name": "Professional",
+    "name": "John Doe",
+    "email": "john@example.com",
+    "phone": "1234567890",
+    "address": "123 Main St",
+    "education": "BS Computer Science",
+    "experience": "Software Engineer at XYZ",
+    "skills": "Python, SQL",
+    "certifications": "AWS Certified",
+    "projects": "Resume Builder",
+    "languages": "English, Spanish",
+    "hobbies": "Reading, Hiking"
+}
+PROFILE_JSON = json.dumps(PROFILE).encode()
+PROFILE_UNKNOWN_USER_JSON = json.dumps({**PROFILE, "user_id": 999}).encode()
+NEW_RESUME = {
+    "user_id": 1,
+    "user_resume_id": 1,
+    "name": "John Doe Resume",
+    "job_title": "Software Engineer",
+    "job_description": "Develop software solutions"
+}
+NEW_RESUME_JSON = json.dumps(NEW_RESUME).encode()
+NEW_RESUME_UNKNOWN_USER_JSON = json.dumps({**NEW_RESUME, "user_id": 999}).encode()
 
 # Test /login endpoint
-@pytest.mark.asyncio
-async def test_login_success(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.check_login.return_value = {
-        "status": "success",
-        "user": {"id": 1, "name": "John Doe", "email": "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"}
-    }
-    response = client.post("/login", json={"email": "john@example.com", "password": "password123"})
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["user"]["email"] == "john@example.com"
-
-@pytest.mark.asyncio
-async def test_login_invalid_credentials(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.check_login.return_value = {"status": "error", "message": "Invalid credentials"}
-    response = client.post("/login", json={"email": "john@example.com", "password": "wrongpassword"})
-    assert response.status_code == 401
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "Invalid credentials"
+def test_login_success(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.acheck_login.return_value = {
+            "status": "success",
+            "user": {"id": 1, "name": "John Doe", "email": "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"}
+        }
+        response = client.post("/login", json={"email": "john@example.com", "password": "password123"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["user"]["email"] == "john@example.com"
+
+def test_login_invalid_credentials(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.acheck_login.return_value = {"status": "error", "message": "Invalid credentials"}
+        response = client.post("/login", json={"email": "john@example.com", "password": "wrongpassword"})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid credentials"
 
 # Test /signup endpoint
-@pytest.mark.asyncio
-async def test_signup_success(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.signup.return_value = {
-        "status": "success",
-        "user": {"name": "John Doe", "email": "john@example.com"}
-    }
-    response = client.post("/signup", json={
-        "name": "John Doe",
-        "email": "john@example.com",
-        "password": "password123",
-        "phone": "1234567890"
-    })
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["user"]["email"] == "john@example.com"
-
-@pytest.mark.asyncio
-async def test_signup_duplicate_email(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.signup.return_value = {"status": "error", "message": "User already exists"}
-    response = client.post("/signup", json={
-        "name": "John Doe",
-        "email": "john@example.com",
-        "password": "password123",
-        "phone": "1234567890"
-    })
-    assert response.status_code == 400
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User already exists"
+def test_signup_success(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.asignup.return_value = {
+            "status": "success",
+            "user": {"name": "John Doe", "email": "john@example.com"}
+        }
+        response = client.post("/signup", content=SIGNUP_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["user"]["email"] == "john@example.com"
+
+def test_signup_duplicate_email(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.asignup.return_value = {"status": "error", "message": "User already exists"}
+        response = client.post("/signup", content=SIGNUP_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "User already exists"
 
 # Test /user/{user_id} endpoint
-@pytest.mark.asyncio
-async def test_get_user_success(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.get_by_id.return_value = {
-        "id": 1, "name": "John Doe", "email":ovelope:
-        "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"
-    }
-    response = client.get("/user/1")
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["user"]["email"] == "john@example.com"
-
-@pytest.mark.asyncio
-async def test_get_user_not_found(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.get_by_id.return_value = None
-    response = client.get("/user/999")
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User not found"
+def test_get_user_success(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.aget_by_id.return_value = {
+            "id": 1, "name": "John Doe", "email": "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"
+        }
+        response = client.get("/user/1")
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["user"]["email"] == "john@example.com"
+
+def test_get_user_not_found(client, mock_user_repo):
+    with overrides(user_repo=mock_user_repo):
+        mock_user_repo.aget_by_id.return_value = None
+        response = client.get("/user/999")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
+
+# Test /user/{user_id}/bundle endpoint
+def test_get_user_bundle_success(client, mock_user_repo, mock_profile_repo, mock_resume_repo):
+    with overrides(user_repo=mock_user_repo, profile_repo=mock_profile_repo, resume_repo=mock_resume_repo):
+        mock_user_repo.aget_by_id.return_value = {
+            "id": 1, "name": "John Doe", "email": "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"
+        }
+        mock_profile_repo.aget_by_user_id.return_value = [{"id": 1, "user_id": 1, "profile_name": "Professional"}]
+        mock_resume_repo.aget_by_user_id.return_value = [
+            {"id": 1, "user_id": 1, "user_resume_id": 1, "job_title": "Software Engineer"},
+            {"id": 2, "user_id": 1, "user_resume_id": 1, "job_title": "Data Engineer"},
+        ]
+        response = client.get("/user/1/bundle")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["user"]["email"] == "john@example.com"
+        assert [profile["profile_name"] for profile in data["profiles"]] == ["Professional"]
+        assert [resume["job_title"] for resume in data["resumes"]] == ["Software Engineer", "Data Engineer"]
+        mock_profile_repo.aget_by_user_id.assert_awaited_once_with(1)
+        mock_resume_repo.aget_by_user_id.assert_awaited_once_with(1)
+
+def test_get_user_bundle_not_found(client, mock_user_repo, mock_profile_repo, mock_resume_repo):
+    with overrides(user_repo=mock_user_repo, profile_repo=mock_profile_repo, resume_repo=mock_resume_repo):
+        mock_user_repo.aget_by_id.return_value = None
+        mock_profile_repo.aget_by_user_id.return_value = []
+        mock_resume_repo.aget_by_user_id.return_value = []
+        response = client.get("/user/999/bundle")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
 
 # Test /profile endpoint
-@pytest.mark.asyncio
-async def test_create_profile_success(mock_user_repo, mock_profile_repo):
-    override_dependencies(mock_user_repo, mock_profile_repo, None, None)
-    mock_user_repo.get_by_id.return_value = {"id": 1, "name": "John Doe", "email": "john@example.com"}
-    mock_profile_repo.create.return_value = {"status": "success", "message": "Profile created successfully", "profile_id": 1}
-    response = client.post("/profile", json={
-        "user_id": 1,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    })
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["new_profile_id"] == 1
-
-@pytest.mark.asyncio
-async def test_create_profile_user_not_found(mock_user_repo, mock_profile_repo):
-    override_dependencies(mock_user_repo, mock_profile_repo, None, None)
-    mock_user_repo.get_by_id.return_value = None
-    response = client.post("/profile", json={
-        "user_id": 999,
-        "profile_name": "Professional",
-        "name": "John Doe",
-        "email": "john@example.com",
-        "phone": "1234567890",
-        "address": "123 Main St",
-        "education": "BS Computer Science",
-        "experience": "Software Engineer at XYZ",
-        "skills": "Python, SQL",
-        "certifications": "AWS Certified",
-        "projects": "Resume Builder",
-        "languages": "English, Spanish",
-        "hobbies": "Reading, Hiking"
-    })
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User not found"
+def test_create_profile_success(client, mock_profile_repo):
+    with overrides(profile_repo=mock_profile_repo):
+        mock_profile_repo.acreate.return_value = {"status": "success", "message": "Profile created successfully", "profile_id": 1}
+        response = client.post("/profile", content=PROFILE_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["new_profile_id"] == 1
+
+def test_create_profile_user_not_found(client, mock_profile_repo):
+    with overrides(profile_repo=mock_profile_repo):
+        mock_profile_repo.acreate.return_value = {"status": "error", "message": "User not found"}
+        response = client.post("/profile", content=PROFILE_UNKNOWN_USER_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
 
 # Test /profile/{user_id} endpoint
-@pytest.mark.asyncio
-async def test_get_profile_by_user_id_success(mock_profile).json()["status"] == "success"
-    assert response.json()["data"]["profiles"][0]["email"] == "john@example.com"
-
-@pytest.mark.asyncio
-async def test_get_profile_by_user_id_not_found(mock_profile_repo):
-    override_dependencies(None, mock_profile_repo, None, None)
-    mock_profile_repo.get_by_user_id.return_value = []
-    response = client.get("/profile/999")
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User profiles not found"
+def test_get_profile_by_user_id_success(client, mock_profile_repo):
+    with overrides(profile_repo=mock_profile_repo):
+        mock_profile_repo.aget_by_user_id.return_value = [{
+            "id": 1, "user_id": 1, "profile_name": "Professional", "name": "John Doe",
+            "email": "john@example.com", "phone": "1234567890", "created_at": "2023-10-01"
+        }]
+        response = client.get("/profile/1")
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["profiles"][0]["email"] == "john@example.com"
+
+def test_get_profile_by_user_id_empty(client, mock_profile_repo):
+    with overrides(profile_repo=mock_profile_repo):
+        mock_profile_repo.aget_by_user_id.return_value = []
+        response = client.get("/profile/999")
+        assert response.status_code == 200
+        assert response.json()["data"]["profiles"] == []
 
 # Test /profile/{user_id}/new_resume endpoint
-@pytest.mark.asyncio
-async def test_create_resume_success(mock_user_repo, mock_resume_service):
-    override_dependencies(mock_user_repo, None, None, mock_resume_service)
-    mock_user_repo.get_by_id.return_value = {"id": 1, "name": "John Doe", "email": "john@example.com"}
-    mock_resume_service.create_resume.return_value = {"status": "success", "message": "Resume created successfully", "resume_id": 1}
-    response = client.post("/profile/1/new_resume", json={
-        "user_id": 1,
-        "user_resume_id": 1,
-        "name": "John Doe Resume",
-        "job_title": "Software Engineer",
-        "job_description": "Develop software solutions"
-    })
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["resume_id"] == 1
-
-@pytest.mark.asyncio
-async def test_create_resume_user_not_found(mock_user_repo):
-    override_dependencies(mock_user_repo, None, None, None)
-    mock_user_repo.get_by_id.return_value = None
-    response = client.post("/profile/999/new_resume", json={
-        "user_id": 999,
-        "user_resume_id": 1,
-        "name": "John Doe Resume",
-        "job_title": "Software Engineer",
-        "job_description": "Develop software solutions"
-    })
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User not found"
+def test_create_resume_success(client, mock_resume_service):
+    with overrides(resume_service=mock_resume_service):
+        mock_resume_service.create_resume.return_value = {
+            "status": "success", "message": "Resume created successfully", "resume_id": 1, "created_at": "2023-10-01"
+        }
+        response = client.post("/profile/1/new_resume", content=NEW_RESUME_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["resume_id"] == 1
 
-# Test /profile/{user_id}/new_resume/{resume_id}/pdf endpoint
-@pytest.mark.asyncio
-async def test_get_resume_pdf_success(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_id.return_value = {
-        "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
-        "job_title": "Software Engineer", "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
-    }
-    with patch("app.core.service.convert_latex_to_pdf", new=AsyncMock(return_value=b"PDF content")):
-        response = client.get("/profile/1/new_resume/1/pdf")
+def test_create_resume_user_not_found(client, mock_user_repo, mock_profile_repo):
+    with overrides(user_repo=mock_user_repo, profile_repo=mock_profile_repo):
+        mock_user_repo.aget_by_id.return_value = None
+        mock_profile_repo.aget_by_id.return_value = None
+        response = client.post("/profile/999/new_resume", content=NEW_RESUME_UNKNOWN_USER_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User not found"
+
+# Test /profile/{user_id}/new_resume/stream endpoint
+def fake_resume_stream(*chunks, error=None):
+    async def stream(*args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+        if error:
+            raise error
+    return stream
+
+def stream_overrides(mock_user_repo, mock_profile_repo, mock_resume_repo):
+    mock_user_repo.aget_by_id.return_value = {"id": 1, "name": "John Doe", "email": "john@example.com"}
+    mock_profile_repo.aget_by_id.return_value = {"id": 1, "user_id": 1, "profile_name": "Professional"}
+    mock_resume_repo.create.return_value = {"status": "success", "message": "Resume created successfully", "resume_id": 1}
+    return overrides(user_repo=mock_user_repo, profile_repo=mock_profile_repo, resume_repo=mock_resume_repo)
+
+def test_stream_resume_saves_full_body(client, mock_user_repo, mock_profile_repo, mock_resume_repo):
+    with stream_overrides(mock_user_repo, mock_profile_repo, mock_resume_repo):
+        with patch("app.api.routes.create_resume_stream", new=fake_resume_stream("\\documentclass", "{article}", " body")):
+            response = client.post("/profile/1/new_resume/stream", content=NEW_RESUME_JSON, headers=JSON_HEADERS)
+        assert response.status_code == 200
+        assert response.text == "\\documentclass{article} body"
+        mock_resume_repo.create.assert_called_once()
+        saved = mock_resume_repo.create.call_args.args[0]
+        assert saved["new_resume"] == "\\documentclass{article} body"
+        assert saved["user_id"] == 1
+
+def test_stream_resume_empty_stream_not_saved(client, mock_user_repo, mock_profile_repo, mock_resume_repo):
+    with stream_overrides(mock_user_repo, mock_profile_repo, mock_resume_repo):
+        with patch("app.api.routes.create_resume_stream", new=fake_resume_stream()):
+            response = client.post("/profile/1/new_resume/stream", content=NEW_RESUME_JSON, headers=JSON_HEADERS)
         assert response.status_code == 200
-        assert response.headers["content-type"] == "application/pdf"
+        assert response.text == ""
+        mock_resume_repo.create.assert_not_called()
+
+def test_stream_resume_aborted_stream_not_saved(client, mock_user_repo, mock_profile_repo, mock_resume_repo):
+    with stream_overrides(mock_user_repo, mock_profile_repo, mock_resume_repo):
+        aborted = fake_resume_stream("\\documentclass", error=RuntimeError("Gemini stream dropped"))
+        with patch("app.api.routes.create_resume_stream", new=aborted):
+            with pytest.raises(RuntimeError):
+                client.post("/profile/1/new_resume/stream", content=NEW_RESUME_JSON, headers=JSON_HEADERS)
+        mock_resume_repo.create.assert_not_called()
 
-@pytest.mark.asyncio
-async def test_get_resume_pdf_not_found(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_id.return_value = None
-    response = client.get("/profile/1/new_resume/999/pdf")
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User resume not found"
+# Test /profile/{user_id}/new_resume/{resume_id}/pdf endpoint
+def test_get_resume_pdf_success(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_id.return_value = {
+            "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
+            "job_title": "Software Engineer", "job_description": "Develop software solutions",
+            "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
+        }
+        pdf_response = Response(b"PDF content", media_type="application/pdf")
+        with patch("app.api.routes.convert_latex_to_pdf", new=AsyncMock(return_value=pdf_response)):
+            response = client.get("/profile/1/new_resume/1/pdf")
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/pdf"
+
+def test_get_resume_pdf_not_found(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_id.return_value = None
+        response = client.get("/profile/1/new_resume/999/pdf")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User resume not found"
 
 # Test /profile/{user_id}/new_resume/{resume_id} endpoint
-@pytest.mark.asyncio
-async def test_get_resume_by_id_success(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_id.return_value = {
-        "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
-        "job_title": "Software Engineer", "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
-    }
-    response = client.get("/profile/1/new_resume/1")
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert response.json()["data"]["resume"]["job_title"] == "Software Engineer"
-
-@pytest.mark.asyncio
-async def test_get_resume_by_id_not_found(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_id.return_value = None
-    response = client.get("/profile/1/new_resume/999")
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User resume not found"
+def test_get_resume_by_id_success(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_id.return_value = {
+            "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
+            "job_title": "Software Engineer", "job_description": "Develop software solutions",
+            "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
+        }
+        response = client.get("/profile/1/new_resume/1")
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert response.json()["data"]["resume"]["job_title"] == "Software Engineer"
+
+def test_get_resume_by_id_not_found(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_id.return_value = None
+        response = client.get("/profile/1/new_resume/999")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "User resume not found"
 
 # Test /profile/{user_id}/new_resume endpoint
-@pytest.mark.asyncio
-async def test_get_all_resumes_by_user_id_success(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_user_id.return_value = [{
-        "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
-        "job_title": "Software Engineer", "job_description": "Develop software solutions",
-        "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
-    }]
-    response = client.get("/profile/1/new_resume")
+def test_get_all_resumes_by_user_id_success(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_user_id.return_value = [{
+            "id": 1, "user_id": 1, "user_resume_id": 1, "name": "John Doe Resume",
+            "job_title": "Software Engineer", "job_description": "Develop software solutions",
+            "new_resume": "LaTeX resume content", "created_at": "2023-10-01"
+        }]
+        response = client.get("/profile/1/new_resume")
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        assert len(response.json()["data"]["resumes"]) == 1
+        assert response.json()["data"]["resumes"][0]["job_title"] == "Software Engineer"
+
+def test_get_all_resumes_by_user_id_empty(client, mock_resume_repo):
+    with overrides(resume_repo=mock_resume_repo):
+        mock_resume_repo.aget_by_user_id.return_value = []
+        response = client.get("/profile/999/new_resume")
+        assert response.status_code == 200
+        assert response.json()["data"]["resumes"] == []
+
+# Test CORS preflight
+def preflight(client, origin):
+    return client.options("/login", headers={"Origin": origin, "Access-Control-Request-Method": "POST"})
+
+def test_cors_allows_frontend_origin(client):
+    response = preflight(client, "http://localhost:5173")
     assert response.status_code == 200
-    assert response.json()["status"] == "success"
-    assert len(response.json()["data"]["resumes"]) == 1
-    assert response.json()["data"]["resumes"][0]["job_title"] == "Software Engineer"
-
-@pytest.mark.asyncio
-async def test_get_all_resumes_by_user_id_not_found(mock_resume_repo):
-    override_dependencies(None, None, mock_resume_repo, None)
-    mock_resume_repo.get_by_user_id.return_value = []
-    response = client.get("/profile/999/new_resume")
-    assert response.status_code == 404
-    assert response.json()["status"] == "error"
-    assert response.json()["message"] == "User resumes not found"
\ No newline at end of file
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert response.headers["access-control-allow-credentials"] == "true"
+
+def test_cors_rejects_unknown_origin(client):
+    response = preflight(client, "https://evil.example.com")
+    assert response.status_code == 400
+    assert "access-control-allow-origin" not in response.headers
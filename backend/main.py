@@ -1,3 +1,5 @@
+import os
+import sys
 import uvicorn
 from app.api import api_routes
 from app.core.logs import logger
@@ -7,4 +9,16 @@ from app.core.logs import logger
 
 if __name__ == "__main__":
     logger.info("Starting the FastAPI application")
-    uvicorn.run(api_routes, host="127.0.0.1", port=8000)
\ No newline at end of file
+    uvicorn.run(
+        # Workers are separate processes, so uvicorn needs the import string rather than the app.
+        # Keep the default of one worker: the repository read caches are per process
+        "app.api:api_routes",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        host="127.0.0.1",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        timeout_keep_alive=30,
+        # Every route already logs its outcome through app.core.logs; skip uvicorn's per-request line
+        access_log=False,
+    )
\ No newline at end of file
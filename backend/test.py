@@ -1,14 +1,55 @@
+import httpx
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 import os
+from typing import Iterator
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Reuse pooled HTTPS connections across calls, for both the sync and the aio clients
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(
+        client_args={"limits": HTTP_LIMITS},
+        async_client_args={"limits": HTTP_LIMITS}
+    )
+)
+
+def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.5, max_output_tokens: int = 256) -> Iterator[str]:
+    """Generates content based on the provided prompts and settings, yielding it as it streams in.
+
+    Use "".join(text_gen(...)) when the whole reply is needed at once.
+
+    Args:
+        system_prompt (str): The instruction for the system.
+        user_prompt (str): The user's input prompt.
+        temperature (float): Controls the randomness of the output.
+        max_output_tokens (int): Maximum number of tokens in the output.
+
+    Yields:
+        str: The next chunk of generated text.
+    """
+    for chunk in client.models.generate_content_stream(
+        model='gemini-2.0-flash-001',
+        contents=[
+            types.Part.from_text(text=system_prompt),
+            types.Part.from_text(text=user_prompt)
+        ],
+        config=types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens
+        )
+    ):
+        if chunk.text:
+            yield chunk.text
+
 
-def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.5, max_output_tokens: int = 256) -> str:
-    """Generates content based on the provided prompts and settings.
+async def text_gen_async(system_prompt: str, user_prompt: str, temperature: float = 0.5, max_output_tokens: int = 256) -> str:
+    """Generates content like text_gen through the aio client, returning the whole reply.
+
+    Several calls can run concurrently with asyncio.gather over the shared connection pool.
 
     Args:
         system_prompt (str): The instruction for the system.
@@ -19,7 +60,7 @@ def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.5, max
     Returns:
         str: The generated text response.
     """
-    response = client.models.generate_content(
+    response = await client.aio.models.generate_content(
         model='gemini-2.0-flash-001',
         contents=[
             types.Part.from_text(text=system_prompt),
@@ -31,5 +72,3 @@ def text_gen(system_prompt: str, user_prompt: str, temperature: float = 0.5, max
         )
     )
     return response.text
-
-